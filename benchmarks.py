@@ -0,0 +1,362 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from thermal_process import ThermalProcess
+from pid_controller import PIDController, AutoTuner, Telemetry
+from simulation import SimClock, SimulationEngine
+
+# Rates, where bigger is better; every other metric is a time
+HIGHER_IS_BETTER = ('steps_per_s', 'sim_speedup', 'delivered_hz')
+# Single worst samples are reported but too noisy to gate on
+NOT_GATED = ('max_ns', 'broadcast_max_ns')
+# Sensor noise seed for every simulated plant, so runs are comparable
+SEED = 0
+# Must never be pulled in by the core (process, controller, tuner, engine) or main.py's import
+HEAVY_MODULES = ('tkinter', 'matplotlib', 'numpy')
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    n = len(samples)
+    pick = lambda q: samples[min(n - 1, int(q * n))]
+    return {'p50_ns': pick(0.50), 'p90_ns': pick(0.90), 'p99_ns': pick(0.99), 'max_ns': samples[-1]}
+
+def _measure(call, n, repeats):
+    """Best-of-`repeats` calls/s for a tight loop, plus a per-call latency distribution."""
+    best = 0.0
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            call()
+        best = max(best, n / (time.perf_counter() - t0))
+    perf_ns = time.perf_counter_ns
+    samples = [0] * n
+    for k in range(n):
+        t0 = perf_ns()
+        call()
+        samples[k] = perf_ns() - t0
+    return dict(steps_per_s=best, **_percentiles(samples))
+
+def bench_pid_compute(n, repeats):
+    clock = SimClock()
+    pid = PIDController(clock=clock)
+    pid.setpoint = 50.0
+    pv = [25.0]
+    def call():
+        clock.now += 0.05
+        pv[0] += (pid.compute(pv[0])['output'] - 0.3) * 0.1
+    return _measure(call, n, repeats)
+
+def bench_pid_compute_into(n, repeats):
+    # Same loop through the in-place API: no result dict per call
+    clock = SimClock()
+    pid = PIDController(clock=clock)
+    pid.setpoint = 50.0
+    out = Telemetry()
+    pv = [25.0]
+    def call():
+        clock.now += 0.05
+        pid.compute_into(pv[0], out)
+        pv[0] += (out.output - 0.3) * 0.1
+    return _measure(call, n, repeats)
+
+def bench_pid_compute_scheduled(n, repeats):
+    # compute_into with a 9x5 gain schedule interpolated every tick
+    try:
+        from gain_schedule import GainSchedule
+    except ImportError as exc:
+        return {'skipped': f"numpy missing: {exc}"}
+    clock = SimClock()
+    pid = PIDController(clock=clock)
+    pid.setpoint = 50.0
+    pid.schedule = GainSchedule([30.0 + 5.0 * k for k in range(9)], [-10.0, -5.0, 0.0, 5.0, 10.0],
+                                [[25.0, 240.0, 40.0]] * 45)
+    out = Telemetry()
+    pv = [25.0]
+    def call():
+        clock.now += 0.05
+        pid.compute_into(pv[0], out)
+        pv[0] += (out.output - 0.3) * 0.1
+    return _measure(call, n, repeats)
+
+def bench_process_update(n, repeats):
+    clock = SimClock()
+    process = ThermalProcess(gain=1.2, tau=120.0, lag=2.0, clock=clock, seed=SEED)
+    def call():
+        clock.now += 0.05
+        process.update(0.5)
+    return _measure(call, n, repeats)
+
+def bench_autotuner_update(n, repeats):
+    # Synthetic PV oscillating around SV so the relay keeps switching
+    clock = SimClock()
+    tuner = [AutoTuner(50.0, clock=clock)]
+    k = [0]
+    def call():
+        clock.now += 0.05
+        k[0] += 1
+        pv = 50.0 + (0.5 if (k[0] // 200) % 2 else -0.5)
+        if tuner[0].update(pv, 50.0)['done']:
+            tuner[0] = AutoTuner(50.0, clock=clock)
+    return _measure(call, n, repeats)
+
+def bench_ui_update_loop(n, repeats):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as exc:
+        return {'skipped': f"no display: {exc}"}
+    try:
+        from ui import E5CC_UI
+        engine = SimulationEngine(seed=SEED)
+        panel = E5CC_UI(root, engine.shared)
+        panel.root = type('NoAfter', (), {'after': staticmethod(lambda *a: None)})() # don't reschedule
+        def call():
+            engine.step()
+            panel.update_loop()
+            root.update_idletasks()
+        return _measure(call, max(1, n // 100), repeats)
+    finally:
+        root.destroy()
+
+def bench_headless_loop(n, repeats):
+    best = 0.0
+    for _ in range(repeats):
+        engine = SimulationEngine(seed=SEED)
+        t0 = time.perf_counter()
+        engine.run(n * engine.dt)
+        best = max(best, engine.ticks / (time.perf_counter() - t0))
+    return {'steps_per_s': best, 'sim_speedup': best * engine.dt}
+
+def bench_autotune_completion(n, repeats):
+    # Settle at SV, then time AT-2 from start to finished P/I/D
+    walls, sims = [], []
+    for _ in range(repeats):
+        engine = SimulationEngine(seed=SEED)
+        engine.run(600.0)
+        engine.state.at_active, engine.state.at_mode = True, "AT-2"
+        start_sim = engine.clock()
+        t0 = time.perf_counter()
+        while engine.state.at_active and engine.clock() - start_sim < 86400.0:
+            engine.step()
+        walls.append(time.perf_counter() - t0)
+        sims.append(engine.clock() - start_sim)
+    return {'wall_s': min(walls), 'sim_s': min(sims)}
+
+def bench_fleet(n, repeats):
+    try:
+        from fleet import Fleet
+    except ImportError as exc:
+        return {'skipped': f"numpy missing: {exc}"}
+    best = 0.0
+    for _ in range(repeats):
+        fleet = Fleet(1000, seed=SEED)
+        steps = max(1, n // 1000)
+        t0 = time.perf_counter()
+        fleet.run(steps * fleet.dt)
+        best = max(best, fleet.n * steps / (time.perf_counter() - t0))
+    return {'steps_per_s': best}
+
+def bench_snapshot_roundtrip(n, repeats):
+    # capture + restore of a warm, noisy engine (rng state and noise block included)
+    from snapshot import capture, restore
+    engine = SimulationEngine(seed=SEED)
+    engine.run(600.0)
+    blob = capture(engine)
+    result = _measure(lambda: restore(engine, capture(engine)), max(1, n // 10), repeats)
+    result['snapshot_bytes'] = len(blob)
+    return result
+
+def bench_ws_broadcast(n, repeats, viewers=500, rate_hz=20.0):
+    # 500 local WebSocket viewers decoding every frame; the server runs on its own thread
+    import asyncio
+    from ws_server import TelemetryServer, FIELD_COUNT, decode
+    duration = max(2.0, n / 10000)
+    engine = SimulationEngine(seed=SEED)
+    server = TelemetryServer(engine.shared, port=0, rate_hz=rate_hz, max_viewers=viewers)
+    samples = []
+    broadcast = server.broadcast
+    def timed(snap):
+        t0 = time.perf_counter_ns()
+        broadcast(snap)
+        samples.append(time.perf_counter_ns() - t0)
+    server.broadcast = timed
+    server.start_in_thread()
+    frames, sizes = [0] * viewers, [0] * viewers
+    request = (b"GET / HTTP/1.1\r\nHost: bench\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+               b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n")
+
+    async def viewer(k, ready):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(request)
+        await reader.readuntil(b"\r\n\r\n")
+        ready.append(k)
+        values = [0] * FIELD_COUNT
+        while True:
+            _, length = await reader.readexactly(2) # Telemetry frames are always < 126 bytes
+            decode(await reader.readexactly(length), values)
+            frames[k] += 1
+            sizes[k] += length + 2
+
+    async def main():
+        ready = []
+        tasks = [asyncio.create_task(viewer(k, ready)) for k in range(viewers)]
+        while len(ready) < viewers: await asyncio.sleep(0.05)
+        await asyncio.sleep(0.5)
+        start, count = list(frames), sum(sizes)
+        del samples[:]
+        # Publish twice per broadcast tick so every tick has a new snapshot to send
+        t0 = time.perf_counter()
+        while time.perf_counter() - t0 < duration:
+            engine.step()
+            await asyncio.sleep(0.5 / rate_hz)
+        elapsed = time.perf_counter() - t0
+        got = sum(frames) - sum(start)
+        for task in tasks: task.cancel()
+        return got / viewers / elapsed, (sum(sizes) - count) / max(1, got)
+
+    try:
+        delivered_hz, frame_bytes = asyncio.run(main())
+    finally:
+        server.stop()
+    return dict(delivered_hz=delivered_hz, bytes_per_frame=frame_bytes, **{
+        'broadcast_' + k: v for k, v in _percentiles(samples).items()})
+
+def _open_loop(integrator, dt, duration, tolerance=1e-4):
+    # Heater alternates 100% / 20% every 10 minutes; PV sampled every minute
+    process = ThermalProcess(gain=1.2, tau=120.0, lag=2.0, clock=SimClock(), noise=0.0,
+                             integrator=integrator, tolerance=tolerance)
+    samples = []
+    per_minute = int(round(60.0 / dt))
+    for k in range(int(round(duration / dt))):
+        power = 1.0 if int(k * dt // 600) % 2 == 0 else 0.2
+        pv = process.update(power, dt=dt)
+        if (k + 1) % per_minute == 0: samples.append(pv)
+    return samples, process.substeps
+
+def bench_integrator_accuracy(n, repeats):
+    # Adaptive RK at 60 s steps against a 2 ms Euler reference
+    duration = 1800.0
+    reference, _ = _open_loop("euler", 0.002, duration)
+    t0 = time.perf_counter()
+    adaptive, substeps = _open_loop("adaptive", 60.0, duration)
+    wall = time.perf_counter() - t0
+    coarse, _ = _open_loop("euler", 0.05, duration)
+    return {
+        'max_error_degC': max(abs(a - b) for a, b in zip(adaptive, reference)),
+        'euler_50ms_error_degC': max(abs(a - b) for a, b in zip(coarse, reference)),
+        'substeps': substeps,
+        'wall_s': wall,
+    }
+
+def _cold_import(module, repeats):
+    # Fresh interpreter per sample: -X importtime cumulative microseconds for `module`
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    best = float('inf')
+    for _ in range(repeats):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        if proc.stdout.strip():
+            raise AssertionError(f"import {module} loaded {proc.stdout.strip()}")
+        for line in proc.stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == module:
+                best = min(best, int(fields[1]) / 1000.0)
+    return best
+
+def bench_import_time(n, repeats):
+    return {
+        'core_import_ms': _cold_import('simulation', repeats),
+        'main_import_ms': _cold_import('main', repeats),
+    }
+
+BENCHMARKS = {
+    'pid_compute': bench_pid_compute,
+    'pid_compute_into': bench_pid_compute_into,
+    'pid_compute_scheduled': bench_pid_compute_scheduled,
+    'process_update': bench_process_update,
+    'autotuner_update': bench_autotuner_update,
+    'ui_update_loop': bench_ui_update_loop,
+    'headless_loop': bench_headless_loop,
+    'autotune_completion': bench_autotune_completion,
+    'fleet_1000': bench_fleet,
+    'ws_broadcast_500': bench_ws_broadcast,
+    'snapshot_roundtrip': bench_snapshot_roundtrip,
+    'integrator_accuracy': bench_integrator_accuracy,
+    'import_time': bench_import_time,
+}
+
+def run(names=None, n=50000, repeats=5):
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = BENCHMARKS[name](n, repeats)
+        print(f"{name:<20} {_fmt(results[name])}", file=sys.stderr)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'n': n, 'repeats': repeats, 'seed': SEED,
+        },
+        'results': results,
+    }
+
+def _fmt(metrics):
+    if 'skipped' in metrics: return f"skipped ({metrics['skipped']})"
+    return "  ".join(f"{k}={v:,.0f}" if v >= 100 else f"{k}={v:.3g}" for k, v in metrics.items())
+
+def compare(base, new, threshold=0.10):
+    """Rows of (benchmark, metric, base, new, relative change, regressed)."""
+    rows = []
+    for name, metrics in new['results'].items():
+        old = base['results'].get(name)
+        if old is None or 'skipped' in metrics or 'skipped' in old: continue
+        for metric, value in metrics.items():
+            if metric not in old or not old[metric]: continue
+            change = (value - old[metric]) / old[metric]
+            worse = change < -threshold if metric in HIGHER_IS_BETTER else change > threshold
+            worse = worse and metric not in NOT_GATED
+            rows.append((name, metric, old[metric], value, change, worse))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the control and plant hot paths")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_run = sub.add_parser('run', help="Run benchmarks and write JSON")
+    p_run.add_argument('--out', default='-', help="JSON output file (default stdout)")
+    p_run.add_argument('--only', action='append', choices=sorted(BENCHMARKS), help="Run only these (repeatable)")
+    p_run.add_argument('-n', type=int, default=50000, help="Calls per measurement")
+    p_run.add_argument('--repeats', type=int, default=5)
+    p_run.add_argument('--quick', action='store_true', help="Small n for a smoke run")
+    p_cmp = sub.add_parser('compare', help="Compare two result files and flag regressions")
+    p_cmp.add_argument('base')
+    p_cmp.add_argument('new')
+    p_cmp.add_argument('--threshold', type=float, default=0.10, help="Relative change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        n, repeats = (5000, 2) if args.quick else (args.n, args.repeats)
+        report = run(args.only, n, repeats)
+        text = json.dumps(report, indent=2)
+        if args.out == '-': print(text)
+        else:
+            with open(args.out, 'w') as f: f.write(text + "\n")
+        return 0
+
+    with open(args.base) as f: base = json.load(f)
+    with open(args.new) as f: new = json.load(f)
+    regressions = 0
+    for name, metric, old, value, change, worse in compare(base, new, args.threshold):
+        flag = "REGRESSION" if worse else ""
+        regressions += worse
+        print(f"{name:<20} {metric:<12} {old:>14,.1f} -> {value:>14,.1f}  {change:+7.1%}  {flag}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import time
+import numpy as np
+from thermal_process import ThermalProcess
+from pid_controller import PIDController
+from simulation import SimClock
+
+# With sensor noise disabled, a fleet loop tracks the scalar
+# ThermalProcess/PIDController pair to within this many degrees.
+SCALAR_ATOL = 1e-6
+
+def _column(value, n, dtype=float):
+    return np.array(np.broadcast_to(np.asarray(value, dtype=dtype), (n,)))
+
+class PIDBank:
+    """N PIDController instances held as arrays, stepped together.
+
+    Same P band / anti-windup / filtered derivative law as PIDController.compute.
+    """
+    def __init__(self, n, p=25.0, i=480.0, d=80.0, reverse=True, setpoint=0.0):
+        self.n = n
+        self.N = 8.0 # Filter coeff
+        self.setpoint = _column(setpoint, n)
+        self.integral = np.zeros(n)
+        self.last_error = np.zeros(n)
+        self.d_filtered = np.zeros(n)
+        self.output = np.zeros(n)
+        self.p_term = np.zeros(n)
+        self.i_term = np.zeros(n)
+        self.d_term = np.zeros(n)
+        self.set_parameters(p, i, d, reverse)
+
+    def set_parameters(self, p, i, d, reverse=True):
+        n = self.n
+        self.p_band = _column(p, n)
+        self.i_time = _column(i, n)
+        self.d_time = _column(d, n)
+        self.reverse = _column(reverse, n, dtype=bool)
+        # Per-loop constants, recomputed only when the parameters change
+        with np.errstate(divide='ignore'):
+            self._scale = 100.0 / self.p_band
+        self._sign = np.where(self.reverse, 1.0, -1.0)
+        self._on_off = self.p_band <= 0.1
+        self._any_on_off = bool(self._on_off.any())
+        self._has_i = self.i_time > 0
+        self._inv_i = np.divide(1.0, self.i_time, out=np.zeros(n), where=self._has_i)
+        self._d_lag = self.d_time / self.N + 0.001
+        self._d_dt = None
+
+    def compute(self, pv, dt):
+        if dt < 0.01:
+            raise ValueError("dt must be >= 0.01 s (PIDController holds its output below that)")
+        error = np.subtract(self.setpoint, pv)
+        error *= self._sign
+
+        # P-Term
+        p_term = error * self._scale
+        if self._any_on_off:
+            p_term[self._on_off] = np.where(error[self._on_off] > 0, 100.0, 0.0)
+
+        # Integral Term with Strict Clamping (Anti-Windup)
+        potential = error * dt
+        potential += self.integral
+        i_term = potential * self._inv_i
+        i_term *= self._scale
+        total = p_term + i_term
+        # Accept inside the band, or when the error pulls back out of saturation
+        accept = np.abs(total) < 100.0
+        accept |= total * error < 0
+        accept &= self._has_i
+        np.copyto(self.integral, potential, where=accept)
+
+        # D-Term (Predictive Brake)
+        de = error - self.last_error
+        de /= dt
+        de -= self.d_filtered
+        if self._d_dt != dt:
+            self._d_alpha = dt / (dt + self._d_lag)
+            self._d_dt = dt
+        de *= self._d_alpha
+        self.d_filtered += de
+        d_term = self._scale * self.d_time
+        d_term *= self.d_filtered
+
+        total += d_term
+        np.clip(total, 0.0, 100.0, out=total)
+        total /= 100.0
+
+        self.last_error = error
+        self.output = total
+        self.p_term, self.i_term, self.d_term = p_term, i_term, d_term
+        return self.output
+
+class ProcessBank:
+    """N ThermalProcess ovens as arrays: nonlinear convection plus sensor lag.
+
+    `update` returns an internal buffer that is overwritten on the next call.
+    """
+    def __init__(self, n, initial_temp=25.0, ambient_temp=25.0, gain=0.1, tau=300.0, lag=5.0, noise=0.01, seed=None):
+        self.n = n
+        self.true_temperature = _column(initial_temp, n)
+        self.displayed_temperature = _column(initial_temp, n)
+        self.ambient_temp = _column(ambient_temp, n)
+        self.k = _column(gain, n)
+        self.tau = _column(tau, n)
+        self.lag_tau = _column(lag, n)
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self._heat_scale = 100.0 * self.k
+        self._pv = np.empty(n)
+        self._dt = None
+
+    def _set_dt(self, dt):
+        # Step constants are cached for the common fixed-dt case
+        self._dt = dt
+        self._rate = dt / self.tau
+        self._lag_alpha = dt / (self.lag_tau + dt)
+
+    def update(self, power, dt, disturbance=0.0):
+        if dt != self._dt:
+            self._set_dt(dt)
+        heat_input = power * self._heat_scale
+        temp_diff = self.true_temperature - self.ambient_temp
+        temp_diff -= disturbance
+
+        # Non-linear cooling (Convection simulation)
+        heat_loss = np.abs(temp_diff)
+        heat_loss *= 0.015
+        heat_loss += 1.5
+        heat_loss *= temp_diff
+        heat_input -= heat_loss
+        heat_input *= self._rate
+        self.true_temperature += heat_input
+
+        # Sensor Lag
+        lag = np.subtract(self.true_temperature, self.displayed_temperature)
+        lag *= self._lag_alpha
+        self.displayed_temperature += lag
+
+        pv = self._pv
+        if self.noise:
+            self.rng.random(out=pv)
+            pv -= 0.5
+            pv *= 2.0 * self.noise
+            pv += self.displayed_temperature
+        else:
+            np.copyto(pv, self.displayed_temperature)
+        return pv
+
+    def reset(self, temp=25.0):
+        self.true_temperature[:] = temp
+        self.displayed_temperature[:] = temp
+
+class Fleet:
+    """Closed-loop fleet: N ovens each driven by its own PID, one step for all.
+
+    Defaults mirror MainApp (gain=1.2, tau=120s, lag=2s, P=25, I=480, D=80).
+    Any keyword may be a scalar or a length-N array. Per-loop cost drops
+    with N: on one core `python fleet.py` measures about 10x the scalar
+    classes' throughput at 100 loops, 50x at 1000 and 90-130x at 10000
+    (see `throughput`).
+    """
+    def __init__(self, n, sv=50.0, p=25.0, i=480.0, d=80.0, reverse=True, initial_temp=25.0,
+                 ambient_temp=25.0, gain=1.2, tau=120.0, lag=2.0, noise=0.01, disturbance=0.0, seed=None, dt=0.05):
+        self.n = n
+        self.dt = dt
+        self.process = ProcessBank(n, initial_temp, ambient_temp, gain, tau, lag, noise, seed)
+        self.pid = PIDBank(n, p, i, d, reverse, setpoint=sv)
+        self.disturbance = _column(disturbance, n)
+        self.pv = _column(initial_temp, n)
+        self.ticks = 0
+
+    @property
+    def sv(self):
+        return self.pid.setpoint
+
+    def step(self, dt=None):
+        dt = self.dt if dt is None else dt
+        output = self.pid.compute(self.pv, dt)
+        self.pv = self.process.update(output, dt, self.disturbance)
+        self.ticks += 1
+        return self.pv
+
+    def run(self, duration, dt=None, callback=None):
+        dt = self.dt if dt is None else dt
+        for _ in range(int(round(duration / dt))):
+            self.step(dt)
+            if callback is not None:
+                callback(self)
+        return self.pv
+
+def compare_with_scalar(loops=8, duration=600.0, dt=0.05, seed=0):
+    """Run `loops` randomized configurations through both Fleet and the scalar
+    classes with noise off; returns the largest PV difference seen (degrees)."""
+    rng = np.random.default_rng(seed)
+    cfg = dict(
+        sv=rng.uniform(40.0, 250.0, loops),
+        p=rng.uniform(0.1, 60.0, loops),
+        i=rng.choice([0.0, 60.0, 240.0, 480.0], loops),
+        d=rng.uniform(0.0, 120.0, loops),
+        reverse=rng.random(loops) < 0.8,
+        gain=rng.uniform(0.5, 3.0, loops),
+        tau=rng.uniform(30.0, 300.0, loops),
+        lag=rng.uniform(0.5, 5.0, loops),
+        disturbance=rng.uniform(-20.0, 20.0, loops),
+    )
+    fleet = Fleet(loops, noise=0.0, dt=dt, **cfg)
+
+    pairs = []
+    for k in range(loops):
+        clock = SimClock()
+        process = ThermalProcess(initial_temp=25.0, ambient_temp=25.0, gain=cfg['gain'][k], tau=cfg['tau'][k],
+                                 lag=cfg['lag'][k], clock=clock, noise=0.0)
+        pid = PIDController(p=cfg['p'][k], i=cfg['i'][k], d=cfg['d'][k], reverse=bool(cfg['reverse'][k]), clock=clock)
+        pid.setpoint = cfg['sv'][k]
+        pairs.append((clock, process, pid, [25.0]))
+
+    worst = 0.0
+    for _ in range(int(round(duration / dt))):
+        fleet.step()
+        for k, (clock, process, pid, pv) in enumerate(pairs):
+            clock.advance(dt)
+            out = pid.compute(pv[0])['output']
+            pv[0] = process.update(out, disturbance=cfg['disturbance'][k])
+            worst = max(worst, abs(pv[0] - fleet.pv[k]))
+    return worst
+
+def throughput(n=1000, steps=2000, dt=0.05):
+    """Loop-steps per second for Fleet and for the scalar classes (noise on)."""
+    fleet = Fleet(n, dt=dt, seed=0)
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        fleet.step()
+    fleet_rate = n * steps / (time.perf_counter() - t0)
+
+    clock = SimClock()
+    process = ThermalProcess(gain=1.2, tau=120.0, lag=2.0, clock=clock)
+    pid = PIDController(clock=clock)
+    pid.setpoint = 50.0
+    pv = 25.0
+    scalar_steps = 20000
+    t0 = time.perf_counter()
+    for _ in range(scalar_steps):
+        clock.advance(dt)
+        pv = process.update(pid.compute(pv)['output'])
+    scalar_rate = scalar_steps / (time.perf_counter() - t0)
+    return fleet_rate, scalar_rate
+
+if __name__ == "__main__":
+    err = compare_with_scalar()
+    print(f"Max |PV fleet - PV scalar|: {err:.2e} (tolerance {SCALAR_ATOL:.0e})")
+    for n in (100, 1000, 10000):
+        fleet_rate, scalar_rate = throughput(n)
+        print(f"N={n:>6}: fleet {fleet_rate / 1e6:7.2f} M loop-steps/s, scalar {scalar_rate / 1e3:6.1f} k/s, speedup {fleet_rate / scalar_rate:6.0f}x")
@@ -0,0 +1,176 @@
+import argparse
+import math
+import sys
+import time
+from types import SimpleNamespace
+import numpy as np
+from thermal_process import ThermalProcess
+from pid_controller import AutoTuner, Telemetry
+from simulation import SimClock, SimulationEngine
+from sweep import DEFAULT_PLANT, LoopMetrics, bounded_map, _frange
+
+class GainSchedule:
+    """P/I/D on a uniform SV x load grid with O(1) bilinear lookup.
+
+    The table is stored as float32 (compact .npz); lookups run on a flat
+    Python list so a tick costs a few float operations and no numpy calls.
+    Values outside the grid are clamped to its edge.
+    """
+    def __init__(self, sv_values, load_values, table):
+        sv_values, load_values = np.asarray(sv_values, dtype=float), np.asarray(load_values, dtype=float)
+        table = np.asarray(table, dtype=np.float32).reshape(len(sv_values), len(load_values), 3)
+        # A single-point axis is widened so the interpolation always has two nodes
+        if len(sv_values) == 1:
+            sv_values, table = np.array([sv_values[0], sv_values[0] + 1.0]), np.repeat(table, 2, axis=0)
+        if len(load_values) == 1:
+            load_values, table = np.array([load_values[0], load_values[0] + 1.0]), np.repeat(table, 2, axis=1)
+        for axis in (sv_values, load_values):
+            steps = np.diff(axis)
+            if np.any(steps <= 0) or not np.allclose(steps, steps[0]):
+                raise ValueError("schedule axes must be increasing and uniformly spaced")
+        self.sv_values, self.load_values, self.table = sv_values, load_values, table
+        self.sv0, self.load0 = float(sv_values[0]), float(load_values[0])
+        self.sv_scale = 1.0 / float(sv_values[1] - sv_values[0])
+        self.load_scale = 1.0 / float(load_values[1] - load_values[0])
+        self.n_sv, self.n_load = len(sv_values), len(load_values)
+        self.sv_last, self.load_last = self.n_sv - 1, self.n_load - 1
+        self.flat = table.astype(float).ravel().tolist()
+
+    def apply(self, pid, sv, load=0.0):
+        """Write the interpolated P/I/D straight into a PIDController."""
+        # Fractional grid position, clamped to the table
+        x = (sv - self.sv0) * self.sv_scale
+        if x < 0.0: x = 0.0
+        elif x > self.sv_last: x = self.sv_last
+        y = (load - self.load0) * self.load_scale
+        if y < 0.0: y = 0.0
+        elif y > self.load_last: y = self.load_last
+        i, j = int(x), int(y)
+        if i == self.sv_last: i -= 1
+        if j == self.load_last: j -= 1
+        fx, fy = x - i, y - j
+        f = self.flat
+        k = (i * self.n_load + j) * 3
+        m = k + self.n_load * 3
+        # Along load on both SV rows, then along SV
+        a = f[k] + fy * (f[k + 3] - f[k]); b = f[m] + fy * (f[m + 3] - f[m])
+        pid.p_band = a + fx * (b - a)
+        a = f[k + 1] + fy * (f[k + 4] - f[k + 1]); b = f[m + 1] + fy * (f[m + 4] - f[m + 1])
+        pid.i_time = a + fx * (b - a)
+        a = f[k + 2] + fy * (f[k + 5] - f[k + 2]); b = f[m + 2] + fy * (f[m + 5] - f[m + 2])
+        pid.d_time = a + fx * (b - a)
+
+    def lookup(self, sv, load=0.0):
+        """(p, i, d) at one operating point."""
+        out = SimpleNamespace()
+        self.apply(out, sv, load)
+        return out.p_band, out.i_time, out.d_time
+
+    def save(self, path):
+        np.savez_compressed(path, sv=self.sv_values, load=self.load_values, table=self.table)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['sv'], data['load'], data['table'])
+
+def tune_point(sv, disturbance=0.0, plant=None, dt=0.05, max_time=3600.0):
+    """AT-2 relay experiment at one operating point, started at SV.
+
+    Returns the tuner's raw (p, i, d), or NaNs if it never finishes (e.g. an
+    SV the heater cannot reach at this load). `dt` is the controller tick.
+    """
+    plant = dict(DEFAULT_PLANT, **(plant or {}))
+    plant.update(initial_temp=sv, noise=0.0)
+    clock = SimClock()
+    process = ThermalProcess(clock=clock, **plant)
+    tuner = AutoTuner(sv, clock=clock)
+    out = Telemetry()
+    pv = sv
+    while clock.now < max_time:
+        clock.advance(dt)
+        if tuner.update_into(pv, sv, out): return tuner.result
+        pv = process.update(out.output, disturbance=disturbance, dt=dt)
+    return (math.nan,) * 3
+
+def _tune_chunk(points, kwargs):
+    return [(k, tune_point(sv, dist, **kwargs)) for k, sv, dist in points]
+
+def build(sv_values, load_values, plant=None, dt=0.05, workers=None, chunk_size=4):
+    """Tune every (SV, load) grid point in parallel. Points that cannot be tuned
+    take the nearest tuned value along the SV axis; returns (schedule, filled)."""
+    sv_values, load_values = list(sv_values), list(load_values)
+    points = ((k, sv, load) for k, (sv, load) in enumerate((sv, load) for sv in sv_values for load in load_values))
+    table = np.full((len(sv_values) * len(load_values), 3), np.nan)
+    kwargs = dict(plant=plant, dt=dt)
+    for k, params in bounded_map(_tune_chunk, points, (kwargs,), workers=workers, chunk_size=chunk_size):
+        table[k] = params
+    table = table.reshape(len(sv_values), len(load_values), 3)
+    filled = 0
+    for j in range(len(load_values)):
+        ok = np.flatnonzero(~np.isnan(table[:, j, 0]))
+        if not len(ok): raise ValueError(f"no SV could be tuned at load {load_values[j]}")
+        for i in np.flatnonzero(np.isnan(table[:, j, 0])):
+            table[i, j] = table[ok[np.argmin(np.abs(ok - i))], j]
+            filled += 1
+    return GainSchedule(sv_values, load_values, table), filled
+
+def step_response(sv, p=None, i=None, d=None, schedule=None, plant=None, start=None, duration=900.0, dt=0.05, band=1.0):
+    """LoopMetrics of a step to `sv` with fixed P/I/D or a schedule."""
+    plant = dict(DEFAULT_PLANT, **(plant or {}))
+    plant.update(initial_temp=sv - 10.0 if start is None else start, noise=0.0)
+    clock = SimClock()
+    engine = SimulationEngine(process=ThermalProcess(clock=clock, **plant), clock=clock, dt=dt)
+    state = engine.state
+    state.pv, state.sv = plant['initial_temp'], sv
+    if schedule is None: state.p, state.i, state.d = p, i, d
+    engine.pid.schedule = schedule
+    metrics = LoopMetrics(band)
+    engine.run(duration, callback=lambda e: metrics.update(clock.now, state.pv, state.sv, state.output, dt))
+    return metrics.result(clock.now)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline gain scheduling: AT-2 over an SV x load grid")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_build = sub.add_parser('build', help="Tune the grid in parallel and write a .npz table")
+    p_build.add_argument('--sv', default='30:70:5', help="SV values, start:stop:step")
+    p_build.add_argument('--load', default='-10:10:5', help="Disturbance values, start:stop:step; a negative start needs '=', e.g. --load=-10:10:5")
+    p_build.add_argument('--gain', type=float, default=DEFAULT_PLANT['gain'])
+    p_build.add_argument('--tau', type=float, default=DEFAULT_PLANT['tau'])
+    p_build.add_argument('--lag', type=float, default=DEFAULT_PLANT['lag'])
+    p_build.add_argument('--ambient', type=float, default=DEFAULT_PLANT['ambient_temp'])
+    p_build.add_argument('--dt', type=float, default=0.05, help="Controller tick (the relay result depends on it)")
+    p_build.add_argument('--workers', type=int, default=None)
+    p_build.add_argument('--out', default='schedule.npz')
+    p_build.add_argument('--check', action='store_true', help="Compare step responses: mid-grid fixed P/I/D vs schedule")
+    p_show = sub.add_parser('show', help="Print a table")
+    p_show.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'show':
+        schedule = GainSchedule.load(args.path)
+    else:
+        plant = {'gain': args.gain, 'tau': args.tau, 'lag': args.lag, 'ambient_temp': args.ambient}
+        sv_values, load_values = _frange(args.sv), _frange(args.load)
+        t0 = time.perf_counter()
+        schedule, filled = build(sv_values, load_values, plant, args.dt, args.workers)
+        schedule.save(args.out)
+        print(f"Tuned {len(sv_values)}x{len(load_values)} points in {time.perf_counter() - t0:.1f} s "
+              f"({filled} unreachable, filled from neighbours) -> {args.out}", file=sys.stderr)
+
+    loads = schedule.load_values
+    print("SV \\ load " + "".join(f"{load:>20g}" for load in loads))
+    for i, sv in enumerate(schedule.sv_values):
+        print(f"{sv:<10g}" + "".join(f"{'%.1f/%.0f/%.0f' % tuple(schedule.table[i, j]):>20}" for j in range(len(loads))))
+
+    if args.command == 'build' and args.check:
+        mid = schedule.lookup(float(np.median(sv_values)), 0.0)
+        print(f"\nStep of +10 degC at load 0: fixed P/I/D {mid[0]:.1f}/{mid[1]:.0f}/{mid[2]:.0f} vs schedule")
+        for sv in sv_values:
+            fixed = step_response(sv, *mid, plant=plant, dt=args.dt)
+            sched = step_response(sv, schedule=schedule, plant=plant, dt=args.dt)
+            print(f"  SV {sv:>6g}: IAE {fixed['iae']:8.1f} -> {sched['iae']:8.1f}   "
+                  f"overshoot {fixed['overshoot']:5.2f} -> {sched['overshoot']:5.2f}")
+
+if __name__ == "__main__":
+    main()
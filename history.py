@@ -0,0 +1,92 @@
+import numpy as np
+
+HISTORY_FIELDS = ('t', 'pv', 'sv', 'output', 'p_term', 'i_term', 'd_term')
+
+class RingHistory:
+    """Fixed-capacity telemetry history backed by one preallocated array.
+
+    Every sample is written twice, at `i` and `i + capacity`, so the last N
+    samples are always one contiguous slice: reads are zero-copy views and
+    appends are O(1) regardless of how much history is kept.
+    """
+    def __init__(self, capacity, fields=HISTORY_FIELDS):
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self.column = {name: k for k, name in enumerate(self.fields)}
+        self._buf = np.zeros((len(self.fields), 2 * capacity))
+        self._next = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, *values):
+        # One value per field, in `fields` order (time first)
+        i = self._next
+        self._buf[:, i] = values
+        self._buf[:, i + self.capacity] = values
+        self._next = i + 1 if i + 1 < self.capacity else 0
+        if self.count < self.capacity: self.count += 1
+
+    def _span(self):
+        end = self._next + self.capacity if self.count == self.capacity else self._next
+        return end - self.count, end
+
+    def view(self, field=None):
+        """Chronological view of all retained samples (no copy)."""
+        start, end = self._span()
+        if field is None: return self._buf[:, start:end]
+        return self._buf[self.column[field], start:end]
+
+    def window(self, seconds, field=None):
+        """Samples from the last `seconds` of history, as a view."""
+        start, end = self._span()
+        if end > start:
+            t = self._buf[0, start:end]
+            start += int(np.searchsorted(t, t[-1] - seconds, side='left'))
+        if field is None: return self._buf[:, start:end]
+        return self._buf[self.column[field], start:end]
+
+    def minmax(self, field, seconds, buckets):
+        """Min/max envelope: two points per bucket, keeps every spike visible."""
+        data = self.window(seconds)
+        t, y = data[0], data[self.column[field]]
+        if len(t) <= 2 * buckets: return t, y
+        size = len(t) // buckets
+        n = size * buckets
+        # Drop the oldest remainder so the newest sample is always kept
+        tb, yb = t[-n:].reshape(buckets, size), y[-n:].reshape(buckets, size)
+        lo, hi = yb.argmin(axis=1), yb.argmax(axis=1)
+        first, second = np.minimum(lo, hi), np.maximum(lo, hi)
+        rows = np.arange(buckets)
+        idx = np.empty((buckets, 2), dtype=np.intp)
+        idx[:, 0], idx[:, 1] = first, second
+        return tb[rows[:, None], idx].ravel(), yb[rows[:, None], idx].ravel()
+
+    def lttb(self, field, seconds, threshold):
+        """Largest-Triangle-Three-Buckets downsample to `threshold` points."""
+        data = self.window(seconds)
+        return lttb(data[0], data[self.column[field]], threshold)
+
+def lttb(t, y, threshold):
+    n = len(t)
+    if threshold >= n or threshold < 3: return t, y
+    # Bucket edges for the n-2 interior points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    # Average point of every bucket, via cumulative sums
+    ct, cy = np.concatenate(([0.0], np.cumsum(t))), np.concatenate(([0.0], np.cumsum(y)))
+    counts = edges[1:] - edges[:-1]
+    avg_t = (ct[edges[1:]] - ct[edges[:-1]]) / counts
+    avg_y = (cy[edges[1:]] - cy[edges[:-1]]) / counts
+    avg_t, avg_y = np.append(avg_t[1:], t[-1]), np.append(avg_y[1:], y[-1])
+
+    out = np.empty(threshold, dtype=np.intp)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Triangle area between the previous pick, each candidate and the next bucket average
+        area = np.abs((t[a] - avg_t[b]) * (y[lo:hi] - y[a]) - (t[a] - t[lo:hi]) * (avg_y[b] - y[a]))
+        a = lo + int(area.argmax())
+        out[b + 1] = a
+    return t[out], y[out]
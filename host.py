@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import random
+import threading
+import time
+from thermal_process import ThermalProcess
+from simulation import SimulationEngine
+from scheduler import FixedRateScheduler
+from modbus_server import ModbusServer
+
+class _TickClock:
+    # Plant time shared by every instance; advanced once per host tick
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class VirtualController:
+    """One hosted E5CC: its own process, PID, state and Modbus endpoint."""
+    def __init__(self, index, engine, port, unit):
+        self.index = index
+        self.engine = engine
+        self.port = port
+        self.unit = unit
+        self.steps = 0
+        self.busy = 0.0
+        self.max_step = 0.0
+
+    @property
+    def shared(self):
+        return self.engine.shared
+
+def random_config(rng):
+    """Plausible spread of ovens and tunings around MainApp's defaults."""
+    return {
+        'sv': round(rng.uniform(40.0, 250.0)),
+        'p': round(rng.uniform(10.0, 40.0), 1),
+        'i': rng.choice((120, 240, 480)),
+        'd': rng.choice((0, 40, 80)),
+        'gain': rng.uniform(0.8, 3.0),
+        'tau': rng.uniform(60.0, 300.0),
+        'lag': rng.uniform(1.0, 4.0),
+        'ambient_temp': rng.uniform(18.0, 32.0),
+    }
+
+class ControllerHost:
+    """Runs many independent virtual controllers in one process.
+
+    All instances are stepped back to back on one FixedRateScheduler. Each is
+    reachable over Modbus TCP: instance k answers on port `base_port + k //
+    units_per_port` as unit `k % units_per_port + 1`. With units_per_port=1
+    every controller gets its own port and unit 1.
+    """
+    def __init__(self, configs, host="127.0.0.1", base_port=5020, units_per_port=247, rate_hz=20.0, policy="skip"):
+        self.clock = _TickClock()
+        self.scheduler = FixedRateScheduler(rate_hz, policy)
+        self.host = host
+        self.controllers = []
+        for index, cfg in enumerate(configs):
+            engine = SimulationEngine(clock=self.clock)
+            state = engine.state
+            for key in ('sv', 'p', 'i', 'd', 'reverse', 'disturbance'):
+                if key in cfg: setattr(state, key, cfg[key])
+            ambient = cfg.get('ambient_temp', 25.0)
+            state.pv = ambient
+            engine.process = ThermalProcess(initial_temp=ambient, ambient_temp=ambient, gain=cfg.get('gain', 1.2),
+                                            tau=cfg.get('tau', 120.0), lag=cfg.get('lag', 2.0),
+                                            clock=self.clock, noise=cfg.get('noise', 0.01))
+            port = base_port + index // units_per_port
+            unit = index % units_per_port + 1
+            self.controllers.append(VirtualController(index, engine, port, unit))
+        self.servers = []
+        self.loop = None
+        self.net_thread = None
+        self.tick_busy_max = 0.0
+
+    def tick(self, dt):
+        self.clock.now += dt
+        perf = time.perf_counter
+        t_tick = perf()
+        for vc in self.controllers:
+            t0 = perf()
+            vc.engine.step(dt)
+            elapsed = perf() - t0
+            vc.steps += 1
+            vc.busy += elapsed
+            if elapsed > vc.max_step: vc.max_step = elapsed
+        elapsed = perf() - t_tick
+        if elapsed > self.tick_busy_max: self.tick_busy_max = elapsed
+
+    def start_network(self):
+        """Open one Modbus server per port on a shared event-loop thread.
+        A bind error on any port is raised here."""
+        by_port = {}
+        for vc in self.controllers:
+            by_port.setdefault(vc.port, {})[vc.unit] = vc.shared
+        self.servers = [ModbusServer(units, self.host, port) for port, units in sorted(by_port.items())]
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        failed = []
+
+        def close():
+            # Same shutdown as ModbusServer.start_in_thread, for every port that bound
+            for server in self.servers:
+                if server.server is None: continue
+                server.server.close()
+                for writer in list(server.writers): writer.transport.abort()
+                self.loop.run_until_complete(server.server.wait_closed())
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loop.close()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            try:
+                for server in self.servers:
+                    self.loop.run_until_complete(server.start())
+            except BaseException as exc:
+                # Release the ports that did bind, then hand the error to the caller
+                failed.append(exc)
+                close()
+                return
+            finally:
+                ready.set()
+            self.loop.run_forever()
+            close()
+
+        self.net_thread = threading.Thread(target=run, name="modbus-host", daemon=True)
+        self.net_thread.start()
+        ready.wait()
+        if failed:
+            self.net_thread.join()
+            self.loop = None
+            raise failed[0]
+
+    def run(self, duration=None):
+        stop_at = None if duration is None else time.perf_counter() + duration
+        self.scheduler.run(self.tick, None if stop_at is None else lambda: time.perf_counter() < stop_at)
+
+    def stop(self):
+        self.scheduler.stop()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.net_thread.join(timeout=2.0)
+            self.loop = None
+
+    def report(self):
+        """Per-instance step latency plus aggregate loop timing."""
+        per_instance = [{
+            'index': vc.index, 'port': vc.port, 'unit': vc.unit, 'steps': vc.steps,
+            'mean_us': vc.busy / vc.steps * 1e6 if vc.steps else 0.0,
+            'max_us': vc.max_step * 1e6,
+        } for vc in self.controllers]
+        means = sorted(row['mean_us'] for row in per_instance)
+        aggregate = self.scheduler.stats()
+        aggregate.update({
+            'instances': len(self.controllers),
+            'step_mean_us': sum(means) / len(means) if means else 0.0,
+            'step_p99_us': means[min(len(means) - 1, int(len(means) * 0.99))] if means else 0.0,
+            'step_max_us': max((row['max_us'] for row in per_instance), default=0.0),
+            'tick_max_ms': self.tick_busy_max * 1000.0,
+            'modbus_requests': sum(server.requests for server in self.servers),
+        })
+        return {'aggregate': aggregate, 'instances': per_instance}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless host for many virtual E5CC controllers")
+    parser.add_argument('--count', type=int, default=300)
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=5020, help="First Modbus TCP port")
+    parser.add_argument('--units-per-port', type=int, default=247, help="Unit IDs per port (1 = one port per controller)")
+    parser.add_argument('--rate', type=float, default=20.0)
+    parser.add_argument('--seed', type=int, default=None, help="Seed for the per-instance oven/tuning spread")
+    parser.add_argument('--duration', type=float, default=None, help="Stop after N seconds (default: run until Ctrl+C)")
+    parser.add_argument('--report', type=float, default=5.0, help="Seconds between status lines")
+    parser.add_argument('--no-network', action='store_true', help="Only step the controllers")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    host = ControllerHost([random_config(rng) for _ in range(args.count)], args.host, args.port,
+                          args.units_per_port, args.rate)
+    if not args.no_network:
+        try:
+            host.start_network()
+        except OSError as exc:
+            parser.exit(1, f"Cannot open the Modbus ports: {exc}\n")
+        last = host.controllers[-1]
+        print(f"{args.count} controllers on {args.host}:{args.port}-{last.port}")
+
+    def status():
+        while host.scheduler.running or host.scheduler.ticks == 0:
+            time.sleep(args.report)
+            agg = host.report()['aggregate']
+            print(f"ticks={agg['ticks']} util={agg['utilisation']:.0%} overruns={agg['overruns']} "
+                  f"step mean={agg['step_mean_us']:.1f}us p99={agg['step_p99_us']:.1f}us max={agg['step_max_us']:.0f}us "
+                  f"tick max={agg['tick_max_ms']:.1f}ms lateness max={agg['max_lateness_ms']:.1f}ms polls={agg['modbus_requests']}")
+
+    threading.Thread(target=status, daemon=True).start()
+    try:
+        host.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        host.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import argparse
+import collections
+import math
+import sys
+import time
+import numpy as np
+from thermal_process import ThermalProcess
+from simulation import SimClock, SimulationEngine
+
+class FOPDTProcess:
+    """First order plus dead time plant with the ThermalProcess interface.
+
+    tau dy/dt = baseline + dist_gain * disturbance + gain * u(t - dead_time) - y,
+    discretized exactly for a held input, so any dt is stable.
+    """
+    def __init__(self, gain, tau, dead_time=0.0, baseline=25.0, dist_gain=1.0, initial_temp=None, clock=time.time):
+        self.gain = gain
+        self.tau = tau
+        self.dead_time = dead_time
+        self.baseline = baseline
+        self.dist_gain = dist_gain
+        self.displayed_temperature = baseline if initial_temp is None else initial_temp
+        self.clock = clock
+        self.last_time = self.clock()
+        self.elapsed = 0.0
+        self.u = 0.0
+        self.pending = collections.deque() # (time the input reaches the plant, power)
+
+    def update(self, power, disturbance=0.0, dt=None):
+        now = self.clock()
+        if dt is None: dt = now - self.last_time
+        if dt <= 0: return self.displayed_temperature
+        self.last_time = now
+        start = self.elapsed
+        self.elapsed += dt
+        self.pending.append((start + self.dead_time, power))
+        while self.pending and self.pending[0][0] <= start + 1e-9:
+            self.u = self.pending.popleft()[1]
+        target = self.baseline + self.dist_gain * disturbance + self.gain * self.u
+        self.displayed_temperature += (1.0 - math.exp(-dt / self.tau)) * (target - self.displayed_temperature)
+        return self.displayed_temperature
+
+class ModelFit:
+    """Identified model: parameters, free-run fit quality and a twin factory."""
+    def __init__(self, kind, params, ts):
+        self.kind = kind
+        self.params = params
+        self.ts = ts
+        self.rmse = math.nan
+        self.r2 = math.nan
+
+    def process(self, clock, initial_temp=None):
+        p = self.params
+        if self.kind == "fopdt":
+            return FOPDTProcess(p['gain'], p['tau'], p['dead_time'], p['baseline'], p['dist_gain'], initial_temp, clock)
+        start = p['ambient_temp'] if initial_temp is None else initial_temp
+        return ThermalProcess(initial_temp=start, ambient_temp=p['ambient_temp'], gain=p['gain'], tau=p['tau'],
+                              lag=max(p['lag'], 1e-3), clock=clock, noise=0.0)
+
+    def __repr__(self):
+        values = " ".join(f"{k}={v:.4g}" for k, v in self.params.items())
+        return f"<{self.kind} {values} rmse={self.rmse:.3f} r2={self.r2:.4f}>"
+
+def prepare(t, pv, output, disturbance=None, ts=None, max_samples=20000):
+    """Resample to a uniform grid: PV interpolated, output/disturbance zero-order held."""
+    t = np.asarray(t, dtype=float)
+    pv, output = np.asarray(pv, dtype=float), np.asarray(output, dtype=float)
+    disturbance = np.zeros_like(t) if disturbance is None else np.asarray(disturbance, dtype=float)
+    if len(t) < 10: raise ValueError("need at least 10 samples")
+    if np.ptp(output) < 1e-3: raise ValueError("output never changed: nothing to identify")
+    ts = ts or max(float(np.median(np.diff(t))), (t[-1] - t[0]) / max_samples)
+    grid = np.arange(t[0], t[-1], ts)
+    held = np.clip(np.searchsorted(t, grid, side='right') - 1, 0, len(t) - 1)
+    return {'t': grid, 'pv': np.interp(grid, t, pv), 'u': output[held], 'dist': disturbance[held], 'ts': ts}
+
+def _delays(data, max_dead_time):
+    return range(0, max(1, int(round(max_dead_time / data['ts']))) + 1)
+
+def fit_fopdt(data, max_dead_time=20.0):
+    """ARX y[k+1] = a y[k] + b u[k-d] + e dist[k] + c by least squares, best d by residual."""
+    y, u, dist, ts = data['pv'], data['u'], data['dist'], data['ts']
+    use_dist = np.ptp(dist) > 1e-9
+    best = None
+    for d in _delays(data, max_dead_time):
+        n = len(y) - 1 - d
+        if n < 10: break
+        cols = [y[d:-1], u[:n], np.ones(n)] + ([dist[d:-1]] if use_dist else [])
+        theta, res, *_ = np.linalg.lstsq(np.column_stack(cols), y[d + 1:], rcond=None)
+        sse = float(res[0]) if len(res) else float(np.sum((np.column_stack(cols) @ theta - y[d + 1:]) ** 2))
+        if best is None or sse / n < best[0]: best = (sse / n, d, theta)
+    _, d, theta = best
+    a = min(max(theta[0], 1e-9), 1.0 - 1e-9)
+    params = {
+        'gain': theta[1] / (1.0 - a),
+        'tau': -ts / math.log(a),
+        'dead_time': d * ts,
+        'baseline': theta[2] / (1.0 - a),
+        'dist_gain': theta[3] / (1.0 - a) if use_dist else 1.0,
+    }
+    return _score(ModelFit("fopdt", params, ts), data)
+
+def _lagged_inputs(u, ts, lags):
+    # Mean over each held interval of the input seen through a first-order lag,
+    # for every candidate lag at once (exact for a zero-order-held input)
+    lags = np.maximum(lags, 1e-9)
+    alpha = np.exp(-ts / lags)
+    c = lags / ts * (1.0 - alpha)
+    out = np.empty((len(lags), len(u)))
+    state = np.full(len(lags), u[0])
+    for k, uk in enumerate(u):
+        state -= uk
+        out[:, k] = uk + state * c
+        state *= alpha
+        state += uk
+    return out
+
+def fit_convection(data, max_lag=20.0, grid=41):
+    """ThermalProcess law with its sensor lag L folded onto the input:
+
+        dPV/dt ~= a lag_L(u) - b g(PV - Ta - dist),  g(x) = x (1 + |x|/100)
+
+    a and b are linear given (L, Ta), so every (L, Ta) pair is solved at once
+    from 2x2 normal equations on a grid, then on a finer grid around the best.
+    """
+    y, u, dist, ts = data['pv'], data['u'], data['dist'], data['ts']
+    rate = np.diff(y) / ts
+    ryy = rate @ rate
+    n = len(rate)
+    ambients = np.linspace(y.min() - 60.0, y.min(), grid)
+    lags = np.linspace(0.0, max_lag, grid)
+    for _ in range(2):
+        x = y[None, :-1] - ambients[:, None] - dist[None, :-1]
+        g = x * (1.0 + np.abs(x) / 100.0)                 # (ambients, samples)
+        ul = _lagged_inputs(u[:-1], ts, lags)             # (lags, samples)
+        suu, suy = np.einsum('ij,ij->i', ul, ul), ul @ rate
+        sgg, sgy = np.einsum('ij,ij->i', g, g), g @ rate
+        sug = g @ ul.T                                    # (ambients, lags)
+        # Regressors (u, -g): [[suu, -sug], [-sug, sgg]] (a, b) = (suy, -sgy)
+        det = suu[None, :] * sgg[:, None] - sug * sug
+        a = (suy[None, :] * sgg[:, None] - sug * sgy[:, None]) / det
+        b = (sug * suy[None, :] - suu[None, :] * sgy[:, None]) / det
+        sse = ryy - a * suy[None, :] + b * sgy[:, None]
+        k, m = np.unravel_index(np.nanargmin(sse), sse.shape)
+        ambient, lag, a, b = ambients[k], lags[m], a[k, m], b[k, m]
+        da, dl = ambients[1] - ambients[0], lags[1] - lags[0]
+        ambients = np.linspace(ambient - da, ambient + da, grid)
+        lags = np.linspace(max(0.0, lag - dl), lag + dl, grid)
+    tau = 1.5 / b
+    params = {'gain': a * tau / 100.0, 'tau': tau, 'lag': lag, 'ambient_temp': ambient}
+    return _score(ModelFit("convection", params, ts), data)
+
+def _score(fit, data):
+    # Free-run simulation of the twin itself against the measured PV
+    y, u, dist, ts = data['pv'], data['u'], data['dist'], data['ts']
+    process = fit.process(SimClock(), initial_temp=y[0])
+    sim = np.empty_like(y)
+    sim[0] = y[0]
+    update = process.update
+    for k in range(len(y) - 1):
+        sim[k + 1] = update(u[k], disturbance=dist[k], dt=ts)
+    err = sim - y
+    fit.rmse = float(np.sqrt(np.mean(err ** 2)))
+    fit.r2 = float(1.0 - np.sum(err ** 2) / max(np.sum((y - y.mean()) ** 2), 1e-12))
+    return fit
+
+def identify(t, pv, output, disturbance=None, ts=None, max_dead_time=20.0, max_lag=20.0):
+    """Fit both models; returns them best first (lowest free-run RMSE).
+    `max_dead_time` bounds the FOPDT delay search, `max_lag` the convection sensor lag."""
+    data = prepare(t, pv, output, disturbance, ts)
+    fits = [fit_fopdt(data, max_dead_time), fit_convection(data, max_lag)]
+    return sorted(fits, key=lambda f: f.rmse)
+
+def from_log(log):
+    """(t, pv, output, disturbance) columns of a telemetry_log.TelemetryLog."""
+    return log['t'], log['pv'], log['output'], log['disturbance']
+
+def from_history(history):
+    """(t, pv, output, disturbance) from a RingHistory (no disturbance column)."""
+    return history.view('t'), history.view('pv'), history.view('output'), None
+
+def twin_autotune(fit, sv, initial_temp=None, dt=0.05, max_time=24 * 3600.0):
+    """Run the AT-2 relay experiment on the fitted model, faster than real time.
+
+    Keep `dt` at the live controller's tick: the relay switches on sample
+    instants, so the tuned P depends on it.
+    """
+    clock = SimClock()
+    engine = SimulationEngine(process=fit.process(clock, initial_temp), clock=clock, dt=dt)
+    state = engine.state
+    state.sv = sv
+    state.pv = engine.process.update(0.0, dt=dt)
+    state.at_active, state.at_mode = True, "AT-2"
+    t0 = time.perf_counter()
+    while state.at_active and clock.now < max_time:
+        engine.step()
+    return {
+        'done': not state.at_active,
+        'p': state.p, 'i': state.i, 'd': state.d,
+        'sim_s': clock.now, 'wall_s': time.perf_counter() - t0,
+        'model': fit.kind, 'rmse': fit.rmse, 'r2': fit.r2,
+    }
+
+def _demo_data(seed=1):
+    # Operating data from the default virtual oven: three SV changes, 20 Hz
+    engine = SimulationEngine(seed=seed)
+    rows = []
+    for sv, duration in ((50.0, 600.0), (70.0, 600.0), (60.0, 600.0)):
+        engine.state.sv = sv
+        engine.run(duration, callback=lambda e: rows.append((e.clock(), e.state.pv, e.state.output, e.state.disturbance)))
+    return np.array(rows).T
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Identify a plant model from recorded data and autotune against it")
+    parser.add_argument('log', nargs='?', help="Telemetry log (.e5log) recorded with main.py --record")
+    parser.add_argument('--demo', action='store_true', help="Use data generated from the default virtual oven")
+    parser.add_argument('--sv', type=float, default=None, help="SV for the twin autotune (default: last recorded SV)")
+    parser.add_argument('--from', dest='t0', type=float, default=None, help="Start time (s from first record)")
+    parser.add_argument('--to', dest='t1', type=float, default=None, help="End time (s from first record)")
+    parser.add_argument('--max-dead-time', type=float, default=20.0, help="FOPDT dead-time search range (s)")
+    parser.add_argument('--max-lag', type=float, default=20.0, help="Convection model sensor-lag search range (s)")
+    args = parser.parse_args(argv)
+
+    if args.demo:
+        t, pv, output, dist = _demo_data()
+        sv = args.sv if args.sv is not None else 60.0
+    elif args.log:
+        from telemetry_log import TelemetryLog
+        log = TelemetryLog(args.log)
+        if not len(log): parser.error("empty log")
+        start = log['t'][0]
+        rec = log.between(start + (args.t0 if args.t0 is not None else 0.0), start + args.t1 if args.t1 is not None else np.inf)
+        t, pv, output, dist = from_log(rec)
+        sv = args.sv if args.sv is not None else float(rec['sv'][-1])
+    else:
+        parser.error("give a log file or --demo")
+
+    t0 = time.perf_counter()
+    fits = identify(t, pv, output, dist, max_dead_time=args.max_dead_time, max_lag=args.max_lag)
+    print(f"Identified {len(t)} samples in {time.perf_counter() - t0:.2f} s")
+    for fit in fits:
+        print(f"  {fit}")
+    result = twin_autotune(fits[0], sv, initial_temp=float(pv[-1]))
+    if not result['done']:
+        print("Twin autotune did not finish", file=sys.stderr)
+        return 1
+    print(f"Twin AT-2 at SV {sv:g} ({result['model']}, R2 {result['r2']:.4f}): P={result['p']} I={result['i']} D={result['d']} "
+          f"after {result['sim_s']:.0f} s of model time in {result['wall_s']:.2f} s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
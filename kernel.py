@@ -0,0 +1,161 @@
+import time
+import numpy as np
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        # No JIT available: run the same kernel as plain Python
+        if args and callable(args[0]): return args[0]
+        return lambda fn: fn
+
+# Per-instance state columns
+TRUE, DISPLAYED, INTEGRAL, LAST_ERROR, D_FILTERED, PV, OUTPUT = range(7)
+STATE_COLUMNS = 7
+# Per-instance parameter columns
+SV, P, I, D, SIGN, GAIN, TAU, LAG, AMBIENT, DISTURBANCE = range(10)
+PARAM_COLUMNS = 10
+
+@njit(cache=True, fastmath=False)
+def _run_block(state, params, dt, noise, pv_out, out_out, record):
+    """Fused PID + anti-windup + derivative filter + convection plant + sensor lag.
+
+    Loops instance-outer / step-inner so each loop's state stays in locals.
+    noise[j, k] is the sensor noise added at step k of instance j.
+    """
+    n, steps = noise.shape
+    N = 8.0 # Filter coeff, as PIDController
+    for j in range(n):
+        true_t = state[j, TRUE]; disp = state[j, DISPLAYED]
+        integral = state[j, INTEGRAL]; last_error = state[j, LAST_ERROR]
+        d_f = state[j, D_FILTERED]; pv = state[j, PV]; out = state[j, OUTPUT]
+        sv = params[j, SV]; p_band = params[j, P]; i_time = params[j, I]; d_time = params[j, D]
+        sign = params[j, SIGN]; heat_scale = params[j, GAIN] * 100.0
+        rate = dt / params[j, TAU]; lag_alpha = dt / (params[j, LAG] + dt)
+        ambient = params[j, AMBIENT] + params[j, DISTURBANCE]
+        scale = 100.0 / p_band
+        d_alpha = dt / (dt + (d_time / N + 0.001))
+        for k in range(steps):
+            error = (sv - pv) * sign
+            # P-Term
+            if p_band <= 0.1:
+                p_term = 100.0 if error > 0 else 0.0
+            else:
+                p_term = (error / p_band) * 100.0
+            # Integral Term with Strict Clamping (Anti-Windup)
+            i_term = 0.0
+            if i_time > 0:
+                potential = integral + error * dt
+                i_term = scale * (potential / i_time)
+                total = p_term + i_term
+                if -100.0 < total < 100.0:
+                    integral = potential
+                elif (total >= 100.0 and error < 0) or (total <= -100.0 and error > 0):
+                    integral = potential
+            # D-Term (Predictive Brake)
+            de = (error - last_error) / dt
+            d_f += d_alpha * (de - d_f)
+            d_term = scale * (d_time * d_f)
+            total = p_term + i_term + d_term
+            out = max(0.0, min(100.0, total)) / 100.0
+            last_error = error
+            # Plant: nonlinear convection, then sensor lag
+            temp_diff = true_t - ambient
+            true_t += (out * heat_scale - temp_diff * (1.0 + abs(temp_diff) / 100.0) * 1.5) * rate
+            disp += lag_alpha * (true_t - disp)
+            pv = disp + noise[j, k]
+            if record:
+                pv_out[j, k] = pv
+                out_out[j, k] = out
+        state[j, TRUE] = true_t; state[j, DISPLAYED] = disp
+        state[j, INTEGRAL] = integral; state[j, LAST_ERROR] = last_error
+        state[j, D_FILTERED] = d_f; state[j, PV] = pv; state[j, OUTPUT] = out
+
+class BatchKernel:
+    """N closed loops advanced by one compiled kernel (Numba when installed).
+
+    Same keywords as fleet.Fleet; each may be a scalar or a length-N array.
+    Noise is drawn in blocks from a seeded generator outside the kernel, so
+    the JIT and pure-Python paths produce identical results.
+    """
+    def __init__(self, n, sv=50.0, p=25.0, i=480.0, d=80.0, reverse=True, initial_temp=25.0,
+                 ambient_temp=25.0, gain=1.2, tau=120.0, lag=2.0, noise=0.01, disturbance=0.0, seed=None, dt=0.05):
+        self.n = n
+        self.dt = dt
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.state = np.zeros((n, STATE_COLUMNS))
+        for column in (TRUE, DISPLAYED, PV):
+            self.state[:, column] = initial_temp
+        self.params = np.zeros((n, PARAM_COLUMNS))
+        columns = {SV: sv, P: p, I: i, D: d, GAIN: gain, TAU: tau, LAG: lag, AMBIENT: ambient_temp, DISTURBANCE: disturbance}
+        for column, value in columns.items():
+            self.params[:, column] = value
+        self.params[:, SIGN] = np.where(np.broadcast_to(reverse, (n,)), 1.0, -1.0)
+
+    @property
+    def pv(self):
+        return self.state[:, PV]
+
+    @property
+    def output(self):
+        return self.state[:, OUTPUT]
+
+    def run(self, steps, dt=None, record=False, block_bytes=1 << 24):
+        """Advance `steps` ticks. With record=True returns (pv, output) arrays of
+        shape (n, steps); otherwise the final (pv, output) per instance."""
+        dt = self.dt if dt is None else dt
+        if dt < 0.01:
+            raise ValueError("dt must be >= 0.01 s (PIDController holds its output below that)")
+        block = max(1, min(steps, block_bytes // (8 * self.n)))
+        if record:
+            pv_all, out_all = np.empty((self.n, steps)), np.empty((self.n, steps))
+        dummy = np.empty((0, 0))
+        done = 0
+        while done < steps:
+            size = min(block, steps - done)
+            if self.noise:
+                noise = self.rng.uniform(-self.noise, self.noise, (self.n, size))
+            else:
+                noise = np.zeros((self.n, size))
+            if record:
+                _run_block(self.state, self.params, dt, noise, pv_all[:, done:done + size], out_all[:, done:done + size], True)
+            else:
+                _run_block(self.state, self.params, dt, noise, dummy, dummy, False)
+            done += size
+        if record: return pv_all, out_all
+        return self.pv.copy(), self.output.copy()
+
+def python_reference(kernel, steps, dt=None, record=True):
+    """Same computation through the uncompiled kernel, for cross-checking."""
+    fn = getattr(_run_block, 'py_func', _run_block)
+    dt = kernel.dt if dt is None else dt
+    noise = kernel.rng.uniform(-kernel.noise, kernel.noise, (kernel.n, steps)) if kernel.noise else np.zeros((kernel.n, steps))
+    pv_all, out_all = np.empty((kernel.n, steps)), np.empty((kernel.n, steps))
+    fn(kernel.state, kernel.params, dt, noise, pv_all, out_all, record)
+    return pv_all, out_all
+
+if __name__ == "__main__":
+    from fleet import Fleet
+    print(f"Numba JIT: {'yes' if HAS_NUMBA else 'no (pure Python fallback)'}")
+    # Cross-check against the vectorized fleet with noise off
+    cfg = dict(sv=np.linspace(40, 250, 16), p=np.linspace(5, 60, 16), i=240.0, d=40.0, noise=0.0)
+    fleet, kernel = Fleet(16, **cfg), BatchKernel(16, **cfg)
+    fleet.run(600.0)
+    pv, _ = kernel.run(12000)
+    print(f"Max |PV kernel - PV fleet| after 600 s: {np.abs(pv - fleet.pv).max():.2e}")
+    if HAS_NUMBA:
+        a, b = BatchKernel(8, seed=3), BatchKernel(8, seed=3)
+        jit_pv, _ = a.run(2000, record=True)
+        ref_pv, _ = python_reference(b, 2000)
+        print(f"Max |JIT - pure Python| with noise: {np.abs(jit_pv - ref_pv).max():.2e}")
+
+    n, steps = (10000, 2000) if HAS_NUMBA else (100, 200)
+    kernel = BatchKernel(n, seed=0)
+    kernel.run(10)  # compile / warm up
+    t0 = time.perf_counter()
+    kernel.run(steps)
+    rate = n * steps / (time.perf_counter() - t0)
+    print(f"{n} loops x {steps} steps: {rate / 1e6:.1f} M controller steps/s")
@@ -0,0 +1,77 @@
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+class LiveGraph:
+    """PV/SV strip chart drawn by blitting.
+
+    The axes, ticks and grid are rendered once into a cached background;
+    each frame only restores it and redraws the two lines. A full draw
+    happens only when the window is resized, the span changes, or the data
+    leaves the current Y range. X is seconds before now, so the limits never
+    move while the trace scrolls.
+    """
+    def __init__(self, master, history, bg_color="#1a1a1a", sv_color="#00ff00", span=60, points=500):
+        self.history = history
+        self.points = points # Max points drawn per line, whatever the zoom
+        self.span = span
+        self.cache = None # (key, t, pv, t_sv, sv, lo, hi) of the downsampled window
+        self.background = None
+        self.full_draws = 0
+
+        # Plain Figure: no pyplot global state or backend selection needed
+        self.fig = Figure(figsize=(4, 3), facecolor=bg_color)
+        self.ax = self.fig.add_subplot()
+        self.ax.set_facecolor("black")
+        self.ax.tick_params(colors="#555", labelsize=8)
+        self.ax.set_xlim(-span, 0)
+        self.pv_line, = self.ax.plot([], [], color="white", linewidth=1.5, label="PV", animated=True)
+        self.sv_line, = self.ax.plot([], [], color=sv_color, linewidth=1, linestyle="--", label="SV", animated=True)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def widget(self):
+        return self.canvas.get_tk_widget()
+
+    def on_draw(self, event):
+        # Every full draw (first show, resize, rescale) refreshes the background
+        self.full_draws += 1
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.pv_line)
+        self.ax.draw_artist(self.sv_line)
+
+    def set_span(self, seconds):
+        self.span = seconds
+        self.cache = None
+        self.ax.set_xlim(-seconds, 0)
+        self.background = None # Refit Y and redraw on the next frame
+
+    def _window(self):
+        # Re-downsample only when a sample was appended or the span changed
+        h = self.history
+        key = (h.view('t')[-1], h.count, self.span)
+        if self.cache is None or self.cache[0] != key:
+            t, pv = h.lttb("pv", self.span, self.points)
+            t_sv, sv = h.lttb("sv", self.span, self.points)
+            lo, hi = min(pv.min(), sv.min()), max(pv.max(), sv.max())
+            self.cache = (key, t, pv, t_sv, sv, lo, hi)
+        return self.cache
+
+    def draw(self, pv_now, sv_now, now):
+        """One frame: history window plus the live (now, pv, sv) point."""
+        if len(self.history) == 0: return
+        _, t, pv, t_sv, sv, lo, hi = self._window()
+        self.pv_line.set_data(np.append(t, now) - now, np.append(pv, pv_now))
+        self.sv_line.set_data(np.append(t_sv, now) - now, np.append(sv, sv_now))
+
+        lo, hi = min(lo, pv_now, sv_now), max(hi, pv_now, sv_now)
+        y0, y1 = self.ax.get_ylim()
+        if self.background is None or lo < y0 or hi > y1:
+            pad = max(1.0, 0.1 * (hi - lo))
+            self.ax.set_ylim(lo - pad, hi + pad)
+            self.canvas.draw() # on_draw caches the new background and draws the lines
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.pv_line)
+        self.ax.draw_artist(self.sv_line)
+        self.canvas.blit(self.ax.bbox)
@@ -1,105 +1,125 @@
-import tkinter as tk
-from thermal_process import ThermalProcess
-from pid_controller import PIDController
-from ui import E5CC_UI
+import argparse
+from simulation import SimulationEngine
 import time
 import threading
 
 class MainApp:
-    def __init__(self):
+    def __init__(self, record=None, rate_hz=20.0, overrun="catch_up", modbus=None, metrics=None, graph_hz=10.0,
+                 schedule=None, web=None, snapshot=None):
+        # GUI stack is only imported when a window is actually opened
+        import tkinter as tk
+        from ui import E5CC_UI
         self.root = tk.Tk()
+        self.rate_hz = rate_hz
+        self.overrun = overrun
         
-        # State shared between threads
-        # Optimized default parameters for the virtual oven
-        self.state = type('obj', (object,), {
-            'pv': 25.0,
-            'sv': 50.0,
-            'p': 25.0,     # Proportional Band (25 degrees)
-            'i': 480,      # Integral Time (8 minutes)
-            'd': 80,       # Derivative Time
-            'in_t': 5,     # K-Thermocouple
-            'reverse': True,
-            'output': 0.0,
-            'p_term': 0.0,
-            'i_term': 0.0,
-            'd_term': 0.0,
-            'at_active': False,
-            'at_mode': "OFF", # OFF or AT-2
-            'disturbance': 0.0,
-            'running': True
-        })()
-
-        # Process: gain=1.2, inertia=120s, sensor_lag=2s
-        self.process = ThermalProcess(initial_temp=25.0, ambient_temp=25.0, gain=1.2, tau=120.0, lag=2.0)
-        
-        # PID Controller
-        self.pid = PIDController(p=self.state.p, i=self.state.i, d=self.state.d, reverse=self.state.reverse)
+        # Process (gain=1.2, inertia=120s, sensor_lag=2s) and PID run on the wall clock
+        self.engine = SimulationEngine(clock=time.time)
+        self.state = self.engine.state
+        self.process = self.engine.process
+        self.pid = self.engine.pid
+        if schedule:
+            from gain_schedule import GainSchedule
+            self.pid.schedule = GainSchedule.load(schedule)
+        if record:
+            from telemetry_log import TelemetryRecorder
+            self.engine.recorder = TelemetryRecorder(record)
+        self.modbus = None
+        if modbus:
+            from modbus_server import ModbusServer
+            host, _, port = modbus.rpartition(':')
+            self.modbus = ModbusServer({1: self.engine.shared}, host or "127.0.0.1", int(port)).start_in_thread()
+        self.web = None
+        if web:
+            from ws_server import TelemetryServer
+            host, _, port = web.rpartition(':')
+            self.web = TelemetryServer(self.engine.shared, host or "127.0.0.1", int(port), rate_hz).start_in_thread()
         
-        self.ui = E5CC_UI(self.root, self.state)
+        if metrics is not None:
+            # Scheduler timing shows whether the sim thread is starved (e.g. by the GIL)
+            stats = lambda key: lambda: self.engine.scheduler.stats()[key]
+            metrics.gauge('sim.utilisation', stats('utilisation'))
+            metrics.gauge('sim.overruns', stats('overruns'))
+            metrics.gauge('sim.max_lateness_ms', stats('max_lateness_ms'))
+
+        # The UI only sees published snapshots and queues its edits
+        self.ui = E5CC_UI(self.root, self.engine.shared, metrics, graph_hz)
         
         # Start simulation thread
         self.sim_thread = threading.Thread(target=self.simulation_loop, daemon=True)
         self.sim_thread.start()
         
+        if snapshot:
+            # F5 saves the complete simulation state, F9 rewinds to it
+            self.snapshot_path = snapshot
+            self.root.bind("<F5>", lambda e: self.engine.shared.call(self.save_snapshot))
+            self.root.bind("<F9>", lambda e: self.engine.shared.call(self.load_snapshot))
+        
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.mainloop()
 
     def simulation_loop(self):
-        autotuner = None
-        last_at_sv = None
-        last_at_dist = None
-        while self.state.running:
-            # Handle Auto-tuning
-            if self.state.at_active:
-                # Reset tuner if SV or Disturbance changes during tuning
-                # Significant disturbance change (>2.0) shifts the baseline too much
-                sv_changed = last_at_sv is not None and abs(self.state.sv - last_at_sv) > 0.1
-                dist_changed = last_at_dist is not None and abs(self.state.disturbance - last_at_dist) > 2.0
-                
-                if sv_changed or dist_changed:
-                    autotuner = None 
-                
-                if autotuner is None:
-                    from pid_controller import AutoTuner
-                    autotuner = AutoTuner(self.state.sv)
-                    last_at_sv = self.state.sv
-                    last_at_dist = self.state.disturbance
-                
-                res = autotuner.update(self.state.pv, self.state.sv)
-                if res['done']:
-                    self.state.p = round(res['p'], 1)
-                    self.state.i = int(res['i'])
-                    self.state.d = int(res['d'])
-                    self.state.at_active = False
-                    self.state.at_mode = "OFF"
-                    autotuner = None
-                else:
-                    self.state.output = res['output']
-                    # Telemetry while AT
-                    self.state.p_term = 100.0 if res['output'] > 0 else 0.0
-                    self.state.i_term = 0.0
-                    self.state.d_term = 0.0
-            else:
-                autotuner = None
-                # Normal PID Update
-                self.pid.setpoint = self.state.sv
-                self.pid.set_parameters(self.state.p, self.state.i, self.state.d, self.state.reverse)
-                
-                # Compute PID output and get telemetry
-                telemetry = self.pid.compute(self.state.pv)
-                self.state.output = telemetry['output']
-                self.state.p_term = telemetry['p_term']
-                self.state.i_term = telemetry['i_term']
-                self.state.d_term = telemetry['d_term']
-            
-            # Update physical process
-            self.state.pv = self.process.update(self.state.output, disturbance=self.state.disturbance)
-            
-            time.sleep(0.05)
+        self.engine.run_realtime(self.rate_hz, self.overrun)
+
+    # Both run on the simulation thread between ticks; the result goes to the status bar
+    def save_snapshot(self):
+        from snapshot import capture
+        try:
+            with open(self.snapshot_path, 'wb') as f: f.write(capture(self.engine))
+        except OSError as exc:
+            self.notify(f"Snapshot not saved: {exc}")
+            return
+        self.notify(f"Snapshot saved to {self.snapshot_path} (F9 restores)")
+
+    def load_snapshot(self):
+        from snapshot import restore
+        try:
+            with open(self.snapshot_path, 'rb') as f: restore(self.engine, f.read())
+        except (OSError, ValueError) as exc:
+            self.notify(f"Snapshot not restored: {exc}")
+            return
+        self.notify(f"Restored snapshot {self.snapshot_path}")
+
+    def notify(self, text):
+        # Any thread: Tk widgets are only touched from the Tk loop
+        self.root.after(0, lambda: self.ui.show(self.ui.status_bar, text=text))
 
     def on_close(self):
         self.state.running = False
+        self.sim_thread.join(timeout=1.0)
+        if self.modbus is not None:
+            self.modbus.stop()
+        if self.web is not None:
+            self.web.stop()
+        if self.engine.recorder is not None:
+            self.engine.recorder.close()
         self.root.destroy()
 
+def setup_metrics(port=None, dump=None):
+    # Instrument before any object is created so every call is timed
+    from metrics import METRICS, enable_hot_paths, enable_panel
+    enable_hot_paths(METRICS)
+    enable_panel(METRICS)
+    if port: METRICS.serve_http(port=port)
+    if dump: METRICS.dump_periodically(dump)
+    return METRICS
+
 if __name__ == "__main__":
-    MainApp()
+    parser = argparse.ArgumentParser(description="Omron E5CC Virtual Simulator")
+    parser.add_argument('--record', metavar='PATH', help="Append every simulation tick to a binary telemetry log")
+    parser.add_argument('--rate', type=float, default=20.0, help="Simulation rate in Hz (default 20)")
+    parser.add_argument('--overrun', choices=("catch_up", "skip"), default="catch_up", help="What to do with ticks missed under load")
+    parser.add_argument('--modbus', metavar='[HOST:]PORT', help="Serve the register map over Modbus TCP (unit 1)")
+    parser.add_argument('--web', metavar='[HOST:]PORT', help="Stream telemetry over WebSocket; the dashboard is at http://HOST:PORT/")
+    parser.add_argument('--snapshot', metavar='PATH', help="F5 saves the simulation state to PATH, F9 restores it")
+    parser.add_argument('--schedule', metavar='PATH', help="Gain schedule table from gain_schedule.py (overrides panel P/I/D)")
+    parser.add_argument('--graph-hz', type=float, default=10.0, help="Live graph refresh rate in Hz (default 10)")
+    parser.add_argument('--metrics', action='store_true', help="Time the hot paths and show them above the status bar")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus text on http://127.0.0.1:PORT/metrics (implies --metrics)")
+    parser.add_argument('--metrics-dump', metavar='PATH', help="Rewrite PATH with a JSON metrics snapshot every 10 s (implies --metrics)")
+    args = parser.parse_args()
+    metrics = None
+    if args.metrics or args.metrics_port or args.metrics_dump:
+        metrics = setup_metrics(args.metrics_port, args.metrics_dump)
+    MainApp(record=args.record, rate_hz=args.rate, overrun=args.overrun, modbus=args.modbus, metrics=metrics, graph_hz=args.graph_hz,
+            schedule=args.schedule, web=args.web, snapshot=args.snapshot)
@@ -0,0 +1,178 @@
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper edges in microseconds (last bucket is +Inf)
+BUCKETS_US = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+class Timer:
+    """Call count, total/max time and a fixed-bucket latency histogram."""
+    __slots__ = ('name', 'count', 'total', 'max', 'buckets')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_US) + 1)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max: self.max = seconds
+        us = seconds * 1e6
+        for k, edge in enumerate(BUCKETS_US):
+            if us <= edge:
+                self.buckets[k] += 1
+                return
+        self.buckets[-1] += 1
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_s': self.total,
+            'mean_us': self.total / self.count * 1e6 if self.count else 0.0,
+            'max_us': self.max * 1e6,
+            'buckets_us': BUCKETS_US,
+            'histogram': list(self.buckets),
+        }
+
+class Metrics:
+    """Opt-in hot-path timing.
+
+    Nothing is timed until `instrument()` wraps a method, so the disabled path
+    is the original, untouched code. Gauges are callables sampled on read.
+    """
+    def __init__(self):
+        self.timers = {}
+        self.gauges = {}
+        self._patched = []
+
+    def timer(self, name):
+        t = self.timers.get(name)
+        if t is None:
+            t = self.timers[name] = Timer(name)
+        return t
+
+    def instrument(self, owner, attr, name):
+        """Replace owner.attr with a timed wrapper recorded under `name`."""
+        original = getattr(owner, attr)
+        observe = self.timer(name).observe
+        perf = time.perf_counter
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            t0 = perf()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                observe(perf() - t0)
+
+        self._patched.append((owner, attr, owner.__dict__.get(attr, None) if isinstance(owner, type) else original))
+        setattr(owner, attr, timed)
+
+    def uninstrument(self):
+        for owner, attr, original in reversed(self._patched):
+            if original is None: delattr(owner, attr)
+            else: setattr(owner, attr, original)
+        self._patched.clear()
+
+    def gauge(self, name, read):
+        self.gauges[name] = read
+
+    def snapshot(self):
+        gauges = {}
+        for name, read in self.gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception:
+                pass
+        return {'timers': {name: t.as_dict() for name, t in self.timers.items()}, 'gauges': gauges}
+
+    def summary(self, names=None):
+        # One-line text for the panel's metrics line
+        parts = []
+        for name in names or self.timers:
+            t = self.timers.get(name)
+            if t is not None and t.count:
+                parts.append(f"{name} {t.total / t.count * 1e6:.0f}/{t.max * 1e6:.0f}us")
+        return " | ".join(parts)
+
+    def prometheus(self):
+        lines = []
+        for name, t in self.timers.items():
+            metric = "e5cc_" + name.replace('.', '_') + "_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for edge, n in zip(BUCKETS_US, t.buckets):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{edge / 1e6:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {t.count}')
+            lines.append(f"{metric}_sum {t.total:.9f}")
+            lines.append(f"{metric}_count {t.count}")
+        for name, value in self.snapshot()['gauges'].items():
+            if isinstance(value, (int, float)):
+                metric = "e5cc_" + name.replace('.', '_')
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve_http(self, host="127.0.0.1", port=9108):
+        """Serve /metrics (Prometheus text) and /metrics.json on a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, kind = metrics.prometheus().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, kind = json.dumps(metrics.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def dump_periodically(self, path, interval=10.0):
+        """Rewrite `path` with a JSON snapshot every `interval` seconds."""
+        def run():
+            while True:
+                time.sleep(interval)
+                data = dict(self.snapshot(), time=time.time())
+                with open(path, 'w') as f:
+                    json.dump(data, f)
+
+        threading.Thread(target=run, name="metrics-dump", daemon=True).start()
+
+# Process-wide registry
+METRICS = Metrics()
+
+def enable_hot_paths(metrics=METRICS):
+    """Time the simulation hot paths (wraps methods in place)."""
+    from thermal_process import ThermalProcess
+    from pid_controller import PIDController, AutoTuner
+    from simulation import SimulationEngine
+    metrics.instrument(SimulationEngine, 'step', 'sim.tick')
+    metrics.instrument(PIDController, 'compute_into', 'pid.compute')
+    metrics.instrument(ThermalProcess, 'update', 'process.update')
+    metrics.instrument(AutoTuner, 'update_into', 'autotuner.update')
+    return metrics
+
+def enable_panel(metrics=METRICS):
+    """Time the Tk panel refresh and, separately, its graph redraw."""
+    from ui import E5CC_UI
+    metrics.instrument(E5CC_UI, 'update_loop', 'ui.update_loop')
+    metrics.instrument(E5CC_UI, 'redraw_graph', 'ui.graph')
+    return metrics
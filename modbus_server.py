@@ -0,0 +1,226 @@
+import asyncio
+import socket
+import struct
+import threading
+
+# Virtual E5CC register map (signed 16-bit words)
+#
+# Input registers (FC 04, read-only)      Holding registers (FC 03 / 06 / 16)
+#   0  PV            x10 degC               0  SV           x10 degC
+#   1  SV            x10 degC               1  P band       x10 degC (>= 1)
+#   2  Output        x10 %                  2  I time       s (>= 0)
+#   3  P term        x10 %                  3  D time       s (>= 0)
+#   4  I term        x10 %                  4  AT           0=OFF 1=AT-2
+#   5  D term        x10 %                  5  OREV         0=OR-R 1=OR-D
+#   6  AT active     0/1                    6  Disturbance  x10 degC
+#   7  Disturbance   x10 degC
+INPUT_REGISTERS = 8
+HOLDING_REGISTERS = 7
+
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_ADDRESS = 0x02
+ILLEGAL_VALUE = 0x03
+TARGET_FAILED = 0x0B
+
+MBAP = struct.Struct(">HHHB") # transaction, protocol, length, unit
+
+def _word(value):
+    # Clamp to the signed 16-bit range
+    return max(-32768, min(32767, int(round(value))))
+
+def input_registers(snap):
+    return (_word(snap.pv * 10), _word(snap.sv * 10), _word(snap.output * 1000), _word(snap.p_term * 10),
+            _word(snap.i_term * 10), _word(snap.d_term * 10), 1 if snap.at_active else 0, _word(snap.disturbance * 10))
+
+def holding_registers(snap):
+    return (_word(snap.sv * 10), _word(snap.p * 10), _word(snap.i), _word(snap.d),
+            1 if snap.at_active else 0, 0 if snap.reverse else 1, _word(snap.disturbance * 10))
+
+def _holding_edit(address, raw):
+    """Translate one holding-register write into state fields, or None if invalid."""
+    if address == 0: return {'sv': raw / 10.0}
+    if address == 1: return {'p': raw / 10.0} if raw >= 1 else None
+    if address == 2: return {'i': raw} if raw >= 0 else None
+    if address == 3: return {'d': raw} if raw >= 0 else None
+    if address == 4:
+        if raw not in (0, 1): return None
+        return {'at_active': bool(raw), 'at_mode': "AT-2" if raw else "OFF"}
+    if address == 5: return {'reverse': raw == 0} if raw in (0, 1) else None
+    if address == 6: return {'disturbance': raw / 10.0}
+    return None
+
+class _Unit:
+    # Register images are encoded once per published tick, then reused by every poll
+    __slots__ = ('shared', 'snap', 'inputs', 'holdings')
+
+    def __init__(self, shared):
+        self.shared = shared
+        self.snap = None
+
+    def registers(self):
+        snap = self.shared.snapshot()
+        if snap is not self.snap:
+            self.snap = snap
+            self.inputs = input_registers(snap)
+            self.holdings = holding_registers(snap)
+        return self.inputs, self.holdings
+
+class ModbusServer:
+    """Modbus TCP slave serving one or more virtual controllers by unit ID.
+
+    Reads are answered from the last published snapshot without touching the
+    simulation thread; writes are queued on its SharedState and take effect
+    between ticks.
+    """
+    def __init__(self, units, host="127.0.0.1", port=5020):
+        self.units = {uid: _Unit(shared) for uid, shared in units.items()}
+        self.host = host
+        self.port = port
+        self.server = None
+        self.loop = None
+        self.thread = None
+        self.writers = set()
+        self.requests = 0
+
+    def handle_pdu(self, unit_id, pdu):
+        unit = self.units.get(unit_id)
+        function = pdu[0] if pdu else 0
+        if unit is None: return bytes((function | 0x80, TARGET_FAILED))
+        try:
+            if function in (3, 4):
+                address, count = struct.unpack_from(">HH", pdu, 1)
+                inputs, holdings = unit.registers()
+                table = inputs if function == 4 else holdings
+                if not 1 <= count <= 125 or address + count > len(table):
+                    return bytes((function | 0x80, ILLEGAL_ADDRESS))
+                return struct.pack(f">BB{count}h", function, 2 * count, *table[address:address + count])
+            if function == 6:
+                address, raw = struct.unpack_from(">Hh", pdu, 1)
+                if address >= HOLDING_REGISTERS: return bytes((function | 0x80, ILLEGAL_ADDRESS))
+                edit = _holding_edit(address, raw)
+                if edit is None: return bytes((function | 0x80, ILLEGAL_VALUE))
+                unit.shared.set(**edit)
+                return pdu[:5]
+            if function == 16:
+                address, count, nbytes = struct.unpack_from(">HHB", pdu, 1)
+                if count < 1 or nbytes != 2 * count or address + count > HOLDING_REGISTERS:
+                    return bytes((function | 0x80, ILLEGAL_ADDRESS))
+                values = struct.unpack_from(f">{count}h", pdu, 6)
+                fields = {}
+                for offset, raw in enumerate(values):
+                    edit = _holding_edit(address + offset, raw)
+                    if edit is None: return bytes((function | 0x80, ILLEGAL_VALUE))
+                    fields.update(edit)
+                # One command, so a multi-register write lands in a single tick
+                unit.shared.set(**fields)
+                return struct.pack(">BHH", function, address, count)
+        except struct.error:
+            return bytes((function | 0x80, ILLEGAL_VALUE))
+        return bytes((function | 0x80, ILLEGAL_FUNCTION))
+
+    async def _client(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None: sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.writers.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(MBAP.size)
+                tid, protocol, length, unit_id = MBAP.unpack(header)
+                if length < 2 or length > 254: break
+                pdu = await reader.readexactly(length - 1)
+                if protocol != 0: continue
+                reply = self.handle_pdu(unit_id, pdu)
+                self.requests += 1
+                writer.write(MBAP.pack(tid, 0, len(reply) + 1, unit_id) + reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._client, self.host, self.port)
+        if self.port == 0:
+            self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    def start_in_thread(self):
+        """Run the server on its own event loop thread; returns once it is listening.
+        A bind error (port in use, privileged port) is raised here."""
+        ready = threading.Event()
+        failed = []
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            try:
+                self.loop.run_until_complete(self.start())
+            except BaseException as exc:
+                failed.append(exc)
+                self.loop.close()
+                return
+            finally:
+                ready.set()
+            self.loop.run_forever()
+            self.server.close()
+            # Drop connected masters so their tasks finish before the loop closes
+            for writer in list(self.writers): writer.transport.abort()
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, name="modbus", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if failed:
+            self.thread.join()
+            self.loop = None
+            raise failed[0]
+        return self
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=2.0)
+
+class ModbusClient:
+    """Minimal blocking Modbus TCP master, enough to poke the simulator in tests."""
+    def __init__(self, host="127.0.0.1", port=5020, unit=1, timeout=2.0):
+        self.unit = unit
+        self.tid = 0
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _recv(self, n):
+        data = b""
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk: raise ConnectionError("server closed the connection")
+            data += chunk
+        return data
+
+    def request(self, pdu, unit=None):
+        self.tid = (self.tid + 1) & 0xFFFF
+        self.sock.sendall(MBAP.pack(self.tid, 0, len(pdu) + 1, self.unit if unit is None else unit) + pdu)
+        tid, _, length, _ = MBAP.unpack(self._recv(MBAP.size))
+        reply = self._recv(length - 1)
+        if tid != self.tid: raise IOError(f"transaction mismatch {tid} != {self.tid}")
+        if reply[0] & 0x80: raise IOError(f"Modbus exception {reply[1]:#04x} for function {reply[0] & 0x7F}")
+        return reply
+
+    def read_input_registers(self, address, count):
+        reply = self.request(struct.pack(">BHH", 4, address, count))
+        return list(struct.unpack_from(f">{count}h", reply, 2))
+
+    def read_holding_registers(self, address, count):
+        reply = self.request(struct.pack(">BHH", 3, address, count))
+        return list(struct.unpack_from(f">{count}h", reply, 2))
+
+    def write_register(self, address, value):
+        self.request(struct.pack(">BHh", 6, address, value))
+
+    def write_registers(self, address, values):
+        self.request(struct.pack(f">BHHB{len(values)}h", 16, address, len(values), 2 * len(values), *values))
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,215 @@
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from sweep import DEFAULT_PLANT, evaluate, bounded_map, build_profile
+
+# Reported per metric; saturation_time is seconds with the heater pinned at 0/100%
+MC_METRICS = ('overshoot', 'settling_time', 'saturation_time', 'iae')
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Plant spread around MainApp's oven, one disturbance step per sample
+DEFAULT_DISTRIBUTIONS = {
+    'gain': 'normal:1.2:0.12',
+    'tau': 'uniform:90:150',
+    'lag': 'uniform:1:4',
+    'ambient_temp': 'normal:25:5',
+    'noise': 'uniform:0:0.05',
+    'disturbance': 'normal:0:3',
+    'disturbance_time': 'uniform:900:1200',
+}
+# Physical floor for each sampled value
+MINIMUM = {'gain': 1e-3, 'tau': 1.0, 'lag': 1e-3, 'noise': 0.0, 'disturbance_time': 0.0}
+
+def parse_distribution(spec):
+    """"1.2" (fixed), "uniform:lo:hi", "normal:mean:sd" or "lognormal:median:sigma"."""
+    parts = spec.split(':')
+    if len(parts) == 1: return ('fixed', float(parts[0]), 0.0)
+    kind, a, b = parts[0], float(parts[1]), float(parts[2])
+    if kind not in ('uniform', 'normal', 'lognormal'):
+        raise ValueError(f"unknown distribution: {kind}")
+    return (kind, a, b)
+
+def draw(rng, dist):
+    kind, a, b = dist
+    if kind == 'fixed': return a
+    if kind == 'uniform': return rng.uniform(a, b)
+    if kind == 'normal': return rng.gauss(a, b)
+    return a * math.exp(rng.gauss(0.0, b))
+
+def sample_plant(seed, index, distributions):
+    """Draw sample `index`; depends only on (seed, index), never on workers or chunking."""
+    rng = random.Random(f"{seed}/{index}")
+    values = {}
+    for name in DEFAULT_DISTRIBUTIONS:
+        value = draw(rng, distributions[name])
+        values[name] = max(MINIMUM[name], value) if name in MINIMUM else value
+    values['noise_seed'] = rng.getrandbits(64)
+    return values
+
+class RunningStats:
+    """Welford mean/variance plus min/max in O(1) memory."""
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min: self.min = x
+        if x > self.max: self.max = x
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+class P2Quantile:
+    """Jain & Chlamtac P^2 estimate of one quantile: five markers, O(1) memory."""
+    __slots__ = ('p', 'q', 'n', 'want', 'step')
+
+    def __init__(self, p):
+        self.p = p
+        self.q = []
+        self.n = [0, 1, 2, 3, 4]
+        self.want = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.step = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, x):
+        q, n = self.q, self.n
+        if len(q) < 5:
+            q.append(x)
+            if len(q) == 5: q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]: k += 1
+        for j in range(k + 1, 5): n[j] += 1
+        for j in range(5): self.want[j] += self.step[j]
+        # Move the three middle markers towards their desired positions
+        for j in (1, 2, 3):
+            d = self.want[j] - n[j]
+            if (d >= 1 and n[j + 1] - n[j] > 1) or (d <= -1 and n[j - 1] - n[j] < -1):
+                d = 1 if d > 0 else -1
+                h = q[j] + d / (n[j + 1] - n[j - 1]) * (
+                    (n[j] - n[j - 1] + d) * (q[j + 1] - q[j]) / (n[j + 1] - n[j])
+                    + (n[j + 1] - n[j] - d) * (q[j] - q[j - 1]) / (n[j] - n[j - 1]))
+                if not q[j - 1] < h < q[j + 1]:
+                    h = q[j] + d * (q[j + d] - q[j]) / (n[j + d] - n[j])
+                q[j] = h
+                n[j] += d
+
+    def value(self):
+        if not self.q: return math.nan
+        if len(self.q) < 5:
+            ordered = sorted(self.q)
+            return ordered[int(round(self.p * (len(ordered) - 1)))]
+        return self.q[2]
+
+class MetricSummary:
+    """Streaming summary of one metric; non-finite values (never settled) are only counted."""
+    def __init__(self, quantiles=QUANTILES):
+        self.stats = RunningStats()
+        self.quantiles = [P2Quantile(p) for p in quantiles]
+        self.infinite = 0
+
+    def add(self, x):
+        if not math.isfinite(x):
+            self.infinite += 1
+            return
+        self.stats.add(x)
+        for q in self.quantiles: q.add(x)
+
+    def as_dict(self):
+        s = self.stats
+        out = {'count': s.count, 'infinite': self.infinite, 'mean': s.mean, 'std': s.std,
+               'min': s.min if s.count else math.nan, 'max': s.max if s.count else math.nan}
+        for q in self.quantiles:
+            out[f"p{q.p * 100:g}"] = q.value()
+        return out
+
+def _run_chunk(indices, config):
+    rows = []
+    for index in indices:
+        s = sample_plant(config['seed'], index, config['distributions'])
+        plant = dict(DEFAULT_PLANT, initial_temp=s['ambient_temp'], ambient_temp=s['ambient_temp'],
+                     gain=s['gain'], tau=s['tau'], lag=s['lag'], noise=s['noise'],
+                     seed=s['noise_seed'])
+        profile = build_profile(config['sv'], dist_steps=[(s['disturbance_time'], s['disturbance'])])
+        metrics = evaluate(config['p'], config['i'], config['d'], plant, profile, config['duration'],
+                           config['dt'], config['band'], config['reverse'])
+        rows.append(dict(index=index, **metrics))
+    return rows
+
+def robustness(samples, p=25.0, i=480.0, d=80.0, distributions=None, seed=0, sv=50.0, duration=1800.0,
+               dt=0.25, band=1.0, reverse=True, workers=None, chunk_size=16, progress=None):
+    """Closed-loop Monte Carlo of one tuning over `samples` random plants.
+
+    Returns {metric: summary}. Samples are generated lazily and results are
+    folded into fixed-size aggregates in index order, so memory does not
+    depend on `samples` and the same seed gives the same numbers for any
+    worker count.
+    """
+    specs = dict(DEFAULT_DISTRIBUTIONS, **(distributions or {}))
+    config = dict(seed=seed, distributions={k: parse_distribution(v) for k, v in specs.items()},
+                  p=p, i=i, d=d, sv=sv, duration=duration, dt=dt, band=band, reverse=reverse)
+    summaries = {name: MetricSummary() for name in MC_METRICS}
+    for row in bounded_map(_run_chunk, range(samples), (config,), workers=workers, chunk_size=chunk_size, ordered=True):
+        for name, summary in summaries.items():
+            summary.add(row[name])
+        if progress is not None:
+            progress(row['index'] + 1)
+    return {name: summary.as_dict() for name, summary in summaries.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo robustness of a P/I/D tuning against plant spread")
+    parser.add_argument('--samples', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--p', type=float, default=25.0)
+    parser.add_argument('--i', type=float, default=480.0)
+    parser.add_argument('--d', type=float, default=80.0)
+    for name, spec in DEFAULT_DISTRIBUTIONS.items():
+        parser.add_argument('--' + name.replace('_', '-'), default=spec, metavar='DIST',
+                            help=f"fixed value, uniform:lo:hi, normal:mean:sd or lognormal:median:sigma (default {spec})")
+    parser.add_argument('--sv', type=float, default=50.0)
+    parser.add_argument('--duration', type=float, default=1800.0)
+    parser.add_argument('--dt', type=float, default=0.25)
+    parser.add_argument('--band', type=float, default=1.0, help="Settling band (+/- degC)")
+    parser.add_argument('--direct', action='store_true', help="Direct action (OR-D) instead of reverse")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default=None, help="Write the summary as JSON")
+    args = parser.parse_args(argv)
+
+    distributions = {name: getattr(args, name) for name in DEFAULT_DISTRIBUTIONS}
+    t0 = time.perf_counter()
+    def progress(done):
+        if done % 100 == 0 or done == args.samples:
+            print(f"\r{done}/{args.samples} samples", end="", file=sys.stderr)
+    summary = robustness(args.samples, args.p, args.i, args.d, distributions, args.seed, args.sv, args.duration,
+                         args.dt, args.band, not args.direct, args.workers, progress=progress)
+    print(f" in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+
+    print(f"{'metric':<16} {'mean':>9} {'std':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  never")
+    for name, s in summary.items():
+        print(f"{name:<16} {s['mean']:>9.2f} {s['std']:>9.2f} {s['p50']:>9.2f} {s['p90']:>9.2f} "
+              f"{s['p99']:>9.2f} {s['max']:>9.2f}  {s['infinite']}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(dict(config=vars(args), summary=summary), f, indent=2)
+
+if __name__ == "__main__":
+    main()
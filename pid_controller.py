@@ -1,7 +1,18 @@
+import math
 import time
 
+class Telemetry:
+    """Preallocated per-tick result, written in place by compute_into/update_into."""
+    __slots__ = ('output', 'p_term', 'i_term', 'd_term')
+
+    def __init__(self):
+        self.output = 0.0
+        self.p_term = 0.0
+        self.i_term = 0.0
+        self.d_term = 0.0
+
 class PIDController:
-    def __init__(self, p=25.0, i=480.0, d=80.0, reverse=True):
+    def __init__(self, p=25.0, i=480.0, d=80.0, reverse=True, clock=time.time):
         self.p_band = p
         self.i_time = i
         self.d_time = d
@@ -10,11 +21,16 @@ class PIDController:
         self.setpoint = 0.0
         self.integral = 0.0
         self.last_error = 0.0
-        self.last_time = time.time()
+        self.clock = clock # Injectable time source (SimClock for headless runs)
+        self.last_time = self.clock()
         self.last_output = 0.0
+        self.last_telemetry = {'output': 0.0, 'p_term': 0.0, 'i_term': 0.0, 'd_term': 0.0}
+        self.telemetry = Telemetry() # Backing record for the dict API
         
         self.d_filtered = 0.0
         self.N = 8.0 # Filter coeff
+        self.schedule = None # Optional gain_schedule.GainSchedule: P/I/D follow SV and load
+        self.load = 0.0      # Load hint for the schedule (the engine passes the disturbance)
 
     def set_parameters(self, p, i, d, reverse=True):
         self.p_band = p
@@ -22,10 +38,20 @@ class PIDController:
         self.d_time = d
         self.reverse = reverse
 
-    def compute(self, current_value):
-        now = time.time()
-        dt = now - self.last_time
-        if dt < 0.01: return self.last_output
+    def compute(self, current_value, dt=None):
+        if self.compute_into(current_value, self.telemetry, dt):
+            t = self.telemetry
+            self.last_telemetry = {'output': t.output, 'p_term': t.p_term, 'i_term': t.i_term, 'd_term': t.d_term}
+        return self.last_telemetry
+
+    def compute_into(self, current_value, out, dt=None):
+        """Same step as compute(), written into a Telemetry record instead of a new dict.
+        Returns False, leaving `out` as it was, when the step is held (dt < 0.01 s)."""
+        # dt is measured from the clock unless the caller's scheduler supplies it
+        now = self.clock()
+        if dt is None: dt = now - self.last_time
+        if dt < 0.01: return False
+        if self.schedule is not None: self.schedule.apply(self, self.setpoint, self.load)
             
         error = self.setpoint - current_value
         if not self.reverse: error = -error
@@ -64,26 +90,36 @@ class PIDController:
         self.last_time = now
         self.last_output = clamped_output / 100.0
         
-        return {
-            'output': self.last_output,
-            'p_term': p_term,
-            'i_term': i_term,
-            'd_term': d_term
-        }
+        out.output = self.last_output
+        out.p_term = p_term
+        out.i_term = i_term
+        out.d_term = d_term
+        return True
 
 class AutoTuner:
-    def __init__(self, target_sv):
+    def __init__(self, target_sv, clock=time.time):
         self.target_sv = target_sv
+        self.clock = clock
         self.cycles = 0
         self.peak_times = []
         self.peak_values = []
         self.going_up = True
         self.has_crossed = False
         self.hysteresis = 0.1 # Reduced for higher precision
+        self.result = None # Tuned (p, i, d) once finished
+        self.telemetry = Telemetry()
 
     def update(self, pv, current_sv):
+        if self.update_into(pv, current_sv, self.telemetry):
+            p, i, d = self.result
+            return {"done": True, "p": p, "i": i, "d": d}
+        return {"done": False, "output": self.telemetry.output}
+
+    def update_into(self, pv, current_sv, out):
+        """Relay step written into `out.output`; returns True once tuning is
+        finished, with the tuned values in `self.result` as (p, i, d)."""
         self.target_sv = current_sv
-        now = time.time()
+        now = self.clock()
         
         # Determine output based on Relay with Hysteresis
         if self.going_up:
@@ -121,7 +157,6 @@ class AutoTuner:
                 if a < 0.02: a = 0.02 # Safety floor for ultra-stable systems
                 
                 # Ku = (4 * D) / (pi * a) -> Fundamental gain
-                import math
                 ku = 4.0 / (math.pi * a)
                 
                 # Ziegler-Nichols conversion to Omron parameters
@@ -132,6 +167,8 @@ class AutoTuner:
                 i = 0.5 * tu
                 d = 0.12 * tu
                 
-                return {"done": True, "p": p, "i": i, "d": d}
+                self.result = (p, i, d)
+                return True
         
-        return {"done": False, "output": output}
+        out.output = output
+        return False
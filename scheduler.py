@@ -0,0 +1,87 @@
+import time
+
+# Lateness histogram bucket upper edges, in milliseconds (last bucket is open)
+JITTER_BUCKETS_MS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 25.0, 50.0)
+
+class FixedRateScheduler:
+    """Deadline-based fixed-rate loop.
+
+    Ticks are scheduled at start + n * period, so compute time and sleep
+    overshoot do not accumulate as drift. Every tick receives the nominal
+    period as dt, so all components integrate over the same interval.
+
+    When a tick finishes past the next deadline the policy decides:
+    'catch_up' runs the missed ticks back to back (plant time stays locked
+    to wall time), 'skip' drops them and realigns to the next deadline.
+    """
+    def __init__(self, rate_hz=20.0, policy="catch_up", max_catch_up=10, clock=time.perf_counter, sleep=time.sleep):
+        if policy not in ("catch_up", "skip"):
+            raise ValueError(f"unknown overrun policy: {policy}")
+        self.period = 1.0 / rate_hz
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.sleep = sleep
+        self.running = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.busy = 0.0
+        self.max_lateness = 0.0
+        self.jitter_histogram = [0] * (len(JITTER_BUCKETS_MS) + 1)
+        self.started = self.clock()
+
+    def run(self, tick, should_continue=None):
+        """Call tick(dt) at the configured rate until stop() or should_continue() is False."""
+        self.running = True
+        period = self.period
+        deadline = self.clock()
+        while self.running and (should_continue is None or should_continue()):
+            now = self.clock()
+            if now < deadline:
+                self.sleep(deadline - now)
+                now = self.clock()
+            self._record_lateness(now - deadline)
+
+            tick(period)
+            done = self.clock()
+            self.busy += done - now
+            self.ticks += 1
+
+            deadline += period
+            if done > deadline:
+                self.overruns += 1
+                behind = int((done - deadline) / period)
+                if self.policy == "skip" or behind > self.max_catch_up:
+                    # Realign to the next future deadline instead of bursting
+                    self.skipped += behind + 1
+                    deadline += (behind + 1) * period
+
+    def stop(self):
+        self.running = False
+
+    def _record_lateness(self, late):
+        if late > self.max_lateness: self.max_lateness = late
+        ms = late * 1000.0
+        for k, edge in enumerate(JITTER_BUCKETS_MS):
+            if ms <= edge:
+                self.jitter_histogram[k] += 1
+                return
+        self.jitter_histogram[-1] += 1
+
+    def stats(self):
+        """Timing figures since the last reset_stats()."""
+        elapsed = self.clock() - self.started
+        return {
+            'rate_hz': 1.0 / self.period,
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'utilisation': self.busy / elapsed if elapsed > 0 else 0.0,
+            'max_lateness_ms': self.max_lateness * 1000.0,
+            'jitter_buckets_ms': JITTER_BUCKETS_MS,
+            'jitter_histogram': list(self.jitter_histogram),
+        }
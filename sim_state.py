@@ -0,0 +1,100 @@
+from collections import namedtuple
+from operator import attrgetter
+from queue import SimpleQueue, Empty
+
+STATE_FIELDS = ('pv', 'sv', 'p', 'i', 'd', 'in_t', 'reverse', 'output', 'p_term', 'i_term', 'd_term',
+                'at_active', 'at_mode', 'disturbance')
+
+# Immutable view of one complete tick
+Snapshot = namedtuple('Snapshot', ('tick', 'time') + STATE_FIELDS)
+
+class SimState:
+    """Live controller state, owned and mutated by the simulation thread only."""
+    __slots__ = STATE_FIELDS + ('running',)
+
+    def __init__(self):
+        # Optimized default parameters for the virtual oven
+        self.pv = 25.0
+        self.sv = 50.0
+        self.p = 25.0     # Proportional Band (25 degrees)
+        self.i = 480      # Integral Time (8 minutes)
+        self.d = 80       # Derivative Time
+        self.in_t = 5     # K-Thermocouple
+        self.reverse = True
+        self.output = 0.0
+        self.p_term = 0.0
+        self.i_term = 0.0
+        self.d_term = 0.0
+        self.at_active = False
+        self.at_mode = "OFF" # OFF or AT-2
+        self.disturbance = 0.0
+        self.running = True
+
+_read_fields = attrgetter(*STATE_FIELDS)
+
+class SharedState:
+    """Hand-off point between the simulation thread and its readers/editors.
+
+    The simulation thread publishes a complete Snapshot once per tick by
+    swapping a single reference, so readers never see a half-updated tick and
+    never take a lock. Edits from other threads (UI, Modbus, ...) are queued
+    as commands and applied by the simulation thread between ticks; `call`
+    runs arbitrary work at that same point.
+    """
+    def __init__(self, state=None):
+        self.state = state if state is not None else SimState()
+        self._commands = SimpleQueue()
+        self.publish(0, 0.0)
+
+    # Simulation-thread side
+    def publish(self, tick, time):
+        self._snapshot = Snapshot(tick, time, *_read_fields(self.state))
+
+    def drain(self):
+        """Apply all queued edits to the live state; returns how many ran."""
+        if self._commands.empty(): return 0
+        count = 0
+        state = self.state
+        while True:
+            try:
+                op, name, args = self._commands.get_nowait()
+            except Empty:
+                return count
+            if op == 'set':
+                for key, value in args.items(): setattr(state, key, value)
+            elif op == 'nudge':
+                delta, lo, ndigits = args
+                value = getattr(state, name) + delta
+                if lo is not None: value = max(lo, value)
+                if ndigits is not None: value = round(value, ndigits)
+                setattr(state, name, value)
+            elif op == 'toggle':
+                setattr(state, name, not getattr(state, name))
+            elif op == 'call':
+                args()
+            count += 1
+
+    # Reader / editor side (any thread)
+    def snapshot(self):
+        return self._snapshot
+
+    def set(self, **fields):
+        # All fields change in the same tick
+        for name in fields: _check(name)
+        self._commands.put(('set', None, fields))
+
+    def nudge(self, name, delta, lo=None, ndigits=None):
+        self._commands.put(('nudge', _check(name), (delta, lo, ndigits)))
+
+    def toggle(self, name):
+        self._commands.put(('toggle', _check(name), None))
+
+    def call(self, fn):
+        # Run fn() on the simulation thread between ticks (e.g. snapshot.capture)
+        self._commands.put(('call', None, fn))
+
+def _check(name):
+    # Reject bad names here, not later inside the simulation thread
+    if name not in STATE_FIELDS:
+        raise ValueError(f"unknown state field: {name}")
+    return name
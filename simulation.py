@@ -0,0 +1,147 @@
+import time
+from thermal_process import ThermalProcess
+from pid_controller import PIDController, AutoTuner, Telemetry
+from scheduler import FixedRateScheduler
+from sim_state import SimState, SharedState
+
+class SimClock:
+    """Simulated time source. Pass it as `clock` to the process, PID and tuner
+    so they all see the same plant time instead of the wall clock."""
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, dt):
+        self.now += dt
+        return self.now
+
+def default_state():
+    return SimState()
+
+class SimulationEngine:
+    """Steps process, PID and autotuner against one clock.
+
+    With the default SimClock nothing touches Tk or sleeps, so `run()` goes as
+    fast as the CPU allows. MainApp drives the same engine with `time.time`.
+
+    Other threads must not touch `state` directly: they read
+    `shared.snapshot()` and queue edits on `shared`, which are applied at the
+    start of the next tick.
+
+    A tick allocates no result dicts: PID and tuner write into preallocated
+    Telemetry records. `seed` fixes the default process's sensor noise, so a
+    SimClock run can be replayed bit-for-bit.
+    """
+    def __init__(self, state=None, process=None, pid=None, clock=None, dt=0.05, seed=None):
+        self.clock = clock if clock is not None else SimClock()
+        self.dt = dt
+        self.state = state if state is not None else default_state()
+        self.shared = SharedState(self.state)
+        # Process: gain=1.2, inertia=120s, sensor_lag=2s
+        if process is None:
+            process = ThermalProcess(initial_temp=self.state.pv, ambient_temp=25.0, gain=1.2, tau=120.0, lag=2.0, clock=self.clock, seed=seed)
+        self.process = process
+        if pid is None:
+            pid = PIDController(p=self.state.p, i=self.state.i, d=self.state.d, reverse=self.state.reverse, clock=self.clock)
+        self.pid = pid
+        self.autotuner = None
+        self.telemetry = Telemetry()    # Last PID step (held when the PID holds)
+        self.at_telemetry = Telemetry() # Relay output while tuning
+        self.last_at_sv = None
+        self.last_at_dist = None
+        self.recorder = None # Optional TelemetryRecorder, fed once per tick
+        self.scheduler = None
+        self.ticks = 0
+
+    def step(self, dt=None):
+        # Simulated clocks are advanced here; a wall clock advances on its own.
+        # The same dt goes to the PID and the process so both integrate one interval.
+        advance = getattr(self.clock, 'advance', None)
+        if advance is not None:
+            if dt is None: dt = self.dt
+            advance(dt)
+
+        state = self.state
+        # Operator edits land between ticks, never halfway through one
+        self.shared.drain()
+        # Handle Auto-tuning
+        if state.at_active:
+            # Reset tuner if SV or Disturbance changes during tuning
+            # Significant disturbance change (>2.0) shifts the baseline too much
+            sv_changed = self.last_at_sv is not None and abs(state.sv - self.last_at_sv) > 0.1
+            dist_changed = self.last_at_dist is not None and abs(state.disturbance - self.last_at_dist) > 2.0
+
+            if sv_changed or dist_changed:
+                self.autotuner = None
+
+            if self.autotuner is None:
+                self.autotuner = AutoTuner(state.sv, clock=self.clock)
+                self.last_at_sv = state.sv
+                self.last_at_dist = state.disturbance
+
+            if self.autotuner.update_into(state.pv, state.sv, self.at_telemetry):
+                p, i, d = self.autotuner.result
+                state.p = round(p, 1)
+                state.i = int(i)
+                state.d = int(d)
+                state.at_active = False
+                state.at_mode = "OFF"
+                self.autotuner = None
+            else:
+                state.output = self.at_telemetry.output
+                # Telemetry while AT
+                state.p_term = 100.0 if state.output > 0 else 0.0
+                state.i_term = 0.0
+                state.d_term = 0.0
+        else:
+            self.autotuner = None
+            # Normal PID Update
+            self.pid.setpoint = state.sv
+            self.pid.set_parameters(state.p, state.i, state.d, state.reverse)
+            self.pid.load = state.disturbance # Only used by a gain schedule
+
+            # Compute PID output into the reused record (unchanged if the PID holds)
+            telemetry = self.telemetry
+            self.pid.compute_into(state.pv, telemetry, dt)
+            state.output = telemetry.output
+            state.p_term = telemetry.p_term
+            state.i_term = telemetry.i_term
+            state.d_term = telemetry.d_term
+            pid = self.pid
+            if pid.schedule is not None:
+                # The schedule owns P/I/D: publish the values in use (panel, Modbus, snapshots),
+                # so operator edits and AT results visibly give way to it
+                state.p, state.i, state.d = round(pid.p_band, 1), int(pid.i_time), int(pid.d_time)
+
+        # Update physical process
+        state.pv = self.process.update(state.output, disturbance=state.disturbance, dt=dt)
+        if self.recorder is not None:
+            self.recorder.record(self.clock(), state)
+        self.ticks += 1
+        self.shared.publish(self.ticks, self.clock())
+        return state
+
+    def run(self, duration, dt=None, callback=None):
+        """Advance `duration` seconds of plant time in fixed steps of `dt`.
+        `callback(engine)` is called after every tick, e.g. to collect data."""
+        dt = self.dt if dt is None else dt
+        for _ in range(int(round(duration / dt))):
+            self.step(dt)
+            if callback is not None:
+                callback(self)
+        return self.state
+
+    def run_realtime(self, rate_hz=20.0, policy="catch_up"):
+        # Wall-clock loop used by the GUI thread; stops when state.running goes False
+        self.scheduler = FixedRateScheduler(rate_hz, policy)
+        self.scheduler.run(self.step, lambda: self.state.running)
+
+if __name__ == "__main__":
+    # Headless smoke run: one hour of oven time
+    engine = SimulationEngine()
+    t0 = time.perf_counter()
+    engine.run(3600.0)
+    elapsed = time.perf_counter() - t0
+    print(f"Simulated 3600 s in {elapsed:.2f} s ({engine.ticks / elapsed:.0f} ticks/s), PV={engine.state.pv:.2f}")
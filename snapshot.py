@@ -0,0 +1,285 @@
+import argparse
+import math
+import struct
+import sys
+import time
+from array import array
+from thermal_process import ThermalProcess, INTEGRATORS
+from pid_controller import AutoTuner
+from simulation import SimClock, SimulationEngine
+from sim_state import STATE_FIELDS
+from sweep import LoopMetrics, bounded_map
+
+MAGIC = b"E5CCSNP1"
+HEADER = struct.Struct("<8sBB") # magic, process kind, has autotuner
+
+# Clock-relative times (PID/process last_time, tuner peak times) are stored as
+# offsets from `now`, so a snapshot also restores into a wall-clock engine.
+#   now, dt, ticks | state: pv sv p i d, in_t, flags, output p_term i_term d_term disturbance
+#   engine: last_at_sv last_at_dist (NaN = None), telemetry x4, AT output
+#   PID: p_band i_time d_time setpoint integral last_error last_time last_output d_filtered N load
+ENGINE = struct.Struct("<ddq5diB5d2d4dd11d")
+# flags bits
+REVERSE, AT_ACTIVE, AT_MODE, PID_REVERSE = 1, 2, 4, 8
+
+# target_sv cycles, going_up/has_crossed bits, hysteresis, len(peak_times), len(peak_values)
+TUNER = struct.Struct("<ddBdHH")
+# integrator, true/displayed temperature, ambient, k, tau, lag, noise, tolerance, substep (NaN = None),
+# substeps, last_time, gauss_next (NaN = None), unused noise samples
+THERMAL = struct.Struct("<B9dqddH")
+# gain tau dead_time baseline dist_gain displayed last_time elapsed u, pending inputs
+FOPDT = struct.Struct("<9dI")
+MT_WORDS = 625 # Mersenne Twister state: 624 words plus the index
+
+PROCESS_KINDS = ('ThermalProcess', 'FOPDTProcess') # identify.FOPDTProcess: a fitted twin
+
+def _nan(value):
+    return math.nan if value is None else value
+
+def _none(value):
+    return None if math.isnan(value) else value
+
+def _count(value):
+    # I/D are whole seconds unless someone set a fraction
+    return int(value) if value.is_integer() else value
+
+def _now(clock):
+    return clock.now if hasattr(clock, 'advance') else clock()
+
+def capture(engine):
+    """Complete state of an engine as bytes.
+
+    Must run between ticks: on the simulation thread (see SharedState.call)
+    or while nothing is stepping the engine. The gain schedule and recorder
+    are references, not state, and are left out.
+    """
+    now = _now(engine.clock)
+    s, pid, tuner, process = engine.state, engine.pid, engine.autotuner, engine.process
+    t, at = engine.telemetry, engine.at_telemetry
+    flags = ((REVERSE if s.reverse else 0) | (AT_ACTIVE if s.at_active else 0)
+             | (AT_MODE if s.at_mode == "AT-2" else 0) | (PID_REVERSE if pid.reverse else 0))
+    kind = PROCESS_KINDS.index(type(process).__name__)
+    parts = [
+        HEADER.pack(MAGIC, kind, tuner is not None),
+        ENGINE.pack(now, engine.dt, engine.ticks, s.pv, s.sv, s.p, s.i, s.d, s.in_t, flags,
+                    s.output, s.p_term, s.i_term, s.d_term, s.disturbance,
+                    _nan(engine.last_at_sv), _nan(engine.last_at_dist), t.output, t.p_term, t.i_term, t.d_term, at.output,
+                    pid.p_band, pid.i_time, pid.d_time, pid.setpoint, pid.integral, pid.last_error,
+                    pid.last_time - now, pid.last_output, pid.d_filtered, pid.N, pid.load),
+    ]
+    if tuner is not None:
+        parts.append(TUNER.pack(tuner.target_sv, tuner.cycles, tuner.going_up | tuner.has_crossed << 1,
+                                tuner.hysteresis, len(tuner.peak_times), len(tuner.peak_values)))
+        parts.append(array('d', [p - now for p in tuner.peak_times] + tuner.peak_values).tobytes())
+    if kind == 0:
+        p = process
+        version, words, gauss = p.rng.getstate()
+        unused = p.noise_block[p.noise_index:]
+        parts.append(THERMAL.pack(INTEGRATORS.index(p.integrator), p.true_temperature, p.displayed_temperature,
+                                  p.ambient_temp, p.k, p.tau, p.lag_tau, p.noise, p.tolerance, _nan(p.substep),
+                                  p.substeps, p.last_time - now, _nan(gauss), len(unused)))
+        parts.append(array('I', words).tobytes())
+        parts.append(array('d', unused).tobytes())
+    else:
+        p = process
+        parts.append(FOPDT.pack(p.gain, p.tau, p.dead_time, p.baseline, p.dist_gain, p.displayed_temperature,
+                                p.last_time - now, p.elapsed, p.u, len(p.pending)))
+        parts.append(array('d', [x for pair in p.pending for x in pair]).tobytes())
+    return b"".join(parts)
+
+def _array(blob, offset, typecode, n):
+    values = array(typecode)
+    end = offset + values.itemsize * n
+    if end > len(blob): raise ValueError("truncated snapshot")
+    values.frombytes(blob[offset:end])
+    return values.tolist(), end
+
+def parse(blob):
+    """Split and check a snapshot without touching any engine; ValueError if malformed."""
+    try:
+        magic, kind, has_tuner = HEADER.unpack_from(blob)
+        if magic != MAGIC: raise ValueError("not an E5CC snapshot")
+        if kind >= len(PROCESS_KINDS): raise ValueError(f"unknown process kind {kind}")
+        engine = ENGINE.unpack_from(blob, HEADER.size)
+        offset = HEADER.size + ENGINE.size
+        tuner = None
+        if has_tuner:
+            tuner = TUNER.unpack_from(blob, offset)
+            peaks, offset = _array(blob, offset + TUNER.size, 'd', tuner[-2] + tuner[-1])
+            tuner += (peaks,)
+        if kind == 0:
+            process = THERMAL.unpack_from(blob, offset)
+            if process[0] >= len(INTEGRATORS): raise ValueError(f"unknown integrator {process[0]}")
+            words, offset = _array(blob, offset + THERMAL.size, 'I', MT_WORDS)
+            if words[-1] > MT_WORDS - 1: raise ValueError("bad random generator state")
+            unused, offset = _array(blob, offset, 'd', process[-1])
+            process += (tuple(words), unused)
+        else:
+            process = FOPDT.unpack_from(blob, offset)
+            pending, offset = _array(blob, offset + FOPDT.size, 'd', 2 * process[-1])
+            process += (pending,)
+    except struct.error as exc:
+        raise ValueError(f"truncated snapshot: {exc}") from None
+    if offset != len(blob): raise ValueError(f"{len(blob) - offset} unexpected bytes after the snapshot")
+    return kind, engine, tuner, process
+
+def restore(engine, blob):
+    """Put a captured state back into `engine` (same rules as capture).
+
+    A SimClock is set to the snapshot time; a wall clock keeps running and
+    every stored time is shifted to the present. The whole blob is checked
+    first, so a malformed one raises ValueError with the engine untouched.
+    """
+    kind, values, tuner_values, process_values = parse(blob)
+    if type(engine.process).__name__ != PROCESS_KINDS[kind]:
+        raise ValueError(f"snapshot holds a {PROCESS_KINDS[kind]}, engine has {type(engine.process).__name__}")
+    (now, engine.dt, engine.ticks, pv, sv, p, i, d, in_t, flags, output, p_term, i_term, d_term, disturbance,
+     last_at_sv, last_at_dist, t_out, t_p, t_i, t_d, at_out,
+     p_band, i_time, d_time, setpoint, integral, last_error, pid_last, last_output, d_filtered, n, load
+     ) = values
+    clock = engine.clock
+    if hasattr(clock, 'advance'): clock.now = now
+    else: now = clock()
+
+    s = engine.state
+    s.pv, s.sv, s.p, s.i, s.d, s.in_t = pv, sv, p, _count(i), _count(d), in_t
+    s.reverse, s.at_active = bool(flags & REVERSE), bool(flags & AT_ACTIVE)
+    s.at_mode = "AT-2" if flags & AT_MODE else "OFF"
+    s.output, s.p_term, s.i_term, s.d_term, s.disturbance = output, p_term, i_term, d_term, disturbance
+    engine.last_at_sv, engine.last_at_dist = _none(last_at_sv), _none(last_at_dist)
+    t = engine.telemetry
+    t.output, t.p_term, t.i_term, t.d_term = t_out, t_p, t_i, t_d
+    engine.at_telemetry.output = at_out
+
+    pid = engine.pid
+    pid.p_band, pid.i_time, pid.d_time, pid.reverse = p_band, i_time, d_time, bool(flags & PID_REVERSE)
+    pid.setpoint, pid.integral, pid.last_error, pid.last_time = setpoint, integral, last_error, now + pid_last
+    pid.last_output, pid.d_filtered, pid.N, pid.load = last_output, d_filtered, n, load
+    pid.last_telemetry = {'output': t_out, 'p_term': t_p, 'i_term': t_i, 'd_term': t_d}
+
+    engine.autotuner = None
+    if tuner_values is not None:
+        target_sv, cycles, bits, hysteresis, n_times, n_values, peaks = tuner_values
+        tuner = engine.autotuner = AutoTuner(target_sv, clock=engine.clock)
+        tuner.cycles, tuner.going_up, tuner.has_crossed, tuner.hysteresis = cycles, bool(bits & 1), bool(bits & 2), hysteresis
+        tuner.peak_times = [now + x for x in peaks[:n_times]]
+        tuner.peak_values = peaks[n_times:]
+
+    process = engine.process
+    if kind == 0:
+        (integrator, process.true_temperature, process.displayed_temperature, process.ambient_temp, process.k,
+         process.tau, process.lag_tau, process.noise, process.tolerance, substep, process.substeps, last_time,
+         gauss, _, words, unused) = process_values
+        process.integrator, process.substep, process.last_time = INTEGRATORS[integrator], _none(substep), now + last_time
+        process.rng.setstate((3, words, _none(gauss)))
+        process.noise_block, process.noise_index = unused, 0
+    else:
+        (process.gain, process.tau, process.dead_time, process.baseline, process.dist_gain,
+         process.displayed_temperature, last_time, process.elapsed, process.u, _, pending) = process_values
+        process.last_time = now + last_time
+        process.pending.clear()
+        process.pending.extend(zip(pending[0::2], pending[1::2]))
+    engine.shared.publish(engine.ticks, now)
+    return engine
+
+def engine_from(blob):
+    """New headless (SimClock) engine continuing from a snapshot."""
+    kind = parse(blob)[0]
+    clock = SimClock()
+    if kind == 0:
+        process = ThermalProcess(clock=clock)
+    else:
+        from identify import FOPDTProcess # numpy is only needed for twins
+        process = FOPDTProcess(1.0, 1.0, clock=clock)
+    return restore(SimulationEngine(process=process, clock=clock), blob)
+
+def parse_branch(spec):
+    """"sv+=20,disturbance=5" -> [('sv', '+', 20.0), ('disturbance', '=', 5.0)]; "" is the unchanged run."""
+    actions = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        for op in ('+=', '-=', '='):
+            name, found, value = item.partition(op)
+            if found: break
+        name = name.strip()
+        if not found or name not in STATE_FIELDS or name == 'at_mode':
+            raise ValueError(f"bad branch action: {item!r}")
+        value = float(value)
+        actions.append((name, op[0], -value if op == '-=' else value))
+    return actions
+
+def apply_branch(state, actions):
+    for name, op, value in actions:
+        if op != '=': value += getattr(state, name)
+        if name in ('at_active', 'reverse'): value = bool(value)
+        setattr(state, name, value)
+        # Same coupling as the panel and Modbus: AT mode follows the switch
+        if name == 'at_active': state.at_mode = "AT-2" if value else "OFF"
+
+def branch(blob, actions=(), duration=1800.0, dt=None, band=1.0):
+    """Continue a snapshot for `duration` plant seconds after `actions`; returns metrics."""
+    engine = engine_from(blob)
+    apply_branch(engine.state, actions)
+    dt = engine.dt if dt is None else dt
+    state, clock = engine.state, engine.clock
+    metrics = LoopMetrics(band)
+    pv_min = pv_max = state.pv
+    for _ in range(int(round(duration / dt))):
+        engine.step(dt)
+        metrics.update(clock.now, state.pv, state.sv, state.output, dt)
+        if state.pv < pv_min: pv_min = state.pv
+        elif state.pv > pv_max: pv_max = state.pv
+    return dict(metrics.result(clock.now), pv_end=state.pv, pv_min=pv_min, pv_max=pv_max, sv=state.sv,
+                p=state.p, i=state.i, d=state.d)
+
+def _branch_chunk(chunk, blob, kwargs):
+    return [dict(label=label, **branch(blob, parse_branch(label), **kwargs)) for label in chunk]
+
+def fork(blob, branches, duration=1800.0, dt=None, band=1.0, workers=None):
+    """Run every branch spec (see parse_branch) from the same snapshot over a
+    process pool; rows come back in the order of `branches`."""
+    for spec in branches: parse_branch(spec) # Fail here, not inside a worker
+    kwargs = dict(duration=duration, dt=dt, band=band)
+    return list(bounded_map(_branch_chunk, branches, (blob, kwargs), workers=workers, chunk_size=1, ordered=True))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="What-if branches from a simulator snapshot")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_info = sub.add_parser('info', help="Print the state held in a snapshot")
+    p_info.add_argument('path')
+    p_fork = sub.add_parser('fork', help="Compare operator actions from one snapshot")
+    p_fork.add_argument('branches', nargs='*', metavar='ACTIONS',
+                        help='Comma-separated edits, e.g. "sv+=20" "sv=70,p=15" "disturbance=-5" "at_active=1"')
+    p_fork.add_argument('--from', dest='path', help="Snapshot file (main.py --snapshot, F5); "
+                                                    "default: warm up a headless oven")
+    p_fork.add_argument('--warmup', type=float, default=1200.0, help="Seconds at SV 50 before forking, without --from")
+    p_fork.add_argument('--duration', type=float, default=1800.0, help="Plant seconds per branch")
+    p_fork.add_argument('--dt', type=float, default=None, help="Tick (default: the snapshot's)")
+    p_fork.add_argument('--band', type=float, default=1.0, help="Settling band (+/- degC)")
+    p_fork.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'info' or args.path:
+        with open(args.path, 'rb') as f: blob = f.read()
+    else:
+        engine = SimulationEngine(seed=0)
+        engine.run(args.warmup)
+        blob = capture(engine)
+    engine = engine_from(blob)
+    s = engine.state
+    print(f"t={engine.clock.now:.1f} s  PV={s.pv:.2f}  SV={s.sv:g}  P/I/D={s.p:g}/{s.i:g}/{s.d:g}  "
+          f"out={s.output * 100:.1f}%  dist={s.disturbance:g}  AT={s.at_mode}  "
+          f"{type(engine.process).__name__}, {len(blob)} bytes")
+    if args.command == 'info': return
+
+    t0 = time.perf_counter()
+    rows = fork(blob, [""] + args.branches, args.duration, args.dt, args.band, args.workers)
+    wall = time.perf_counter() - t0
+    print(f"{len(rows)} branches x {args.duration:g} s in {wall:.2f} s "
+          f"({len(rows) * args.duration / wall:.0f}x real time)", file=sys.stderr)
+    print(f"{'branch':<24} {'PV end':>7} {'PV min':>7} {'PV max':>7} {'overshoot':>9} {'settling':>9} {'IAE':>9} {'sat s':>7}")
+    for row in rows:
+        print(f"{row['label'] or '(unchanged)':<24} {row['pv_end']:>7.2f} {row['pv_min']:>7.2f} {row['pv_max']:>7.2f} "
+              f"{row['overshoot']:>9.2f} {row['settling_time']:>9.1f} {row['iae']:>9.1f} {row['saturation_time']:>7.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import argparse
+import collections
+import csv
+import heapq
+import itertools
+import math
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from thermal_process import ThermalProcess, INTEGRATORS
+from simulation import SimClock, SimulationEngine, default_state
+
+# MainApp's virtual oven
+DEFAULT_PLANT = {'initial_temp': 25.0, 'ambient_temp': 25.0, 'gain': 1.2, 'tau': 120.0, 'lag': 2.0, 'noise': 0.01}
+METRICS = ('iae', 'ise', 'overshoot', 'settling_time', 'effort', 'saturation_time')
+
+class LoopMetrics:
+    """Online closed-loop performance figures; nothing is stored per tick.
+
+    iae/ise: integral of |e| and e^2 over time.
+    overshoot: largest excursion past SV in the direction of the last SV step (degC).
+    settling_time: seconds from the last SV step until PV stays within +/- band (inf if never).
+    effort: integral of the 0..1 output, i.e. full-power heater seconds.
+    saturation_time: seconds with the output pinned at 0% or 100%.
+    """
+    def __init__(self, band=1.0):
+        self.band = band
+        self.iae = 0.0
+        self.ise = 0.0
+        self.overshoot = 0.0
+        self.effort = 0.0
+        self.saturation_time = 0.0
+        self.sv = None
+        self.direction = 1.0
+        self.step_time = 0.0
+        self.last_outside = 0.0
+
+    def update(self, t, pv, sv, output, dt):
+        if sv != self.sv:
+            self.direction = 1.0 if sv >= pv else -1.0
+            self.sv = sv
+            self.step_time = t
+            self.last_outside = t
+        error = sv - pv
+        self.iae += abs(error) * dt
+        self.ise += error * error * dt
+        self.effort += output * dt
+        if output <= 0.0 or output >= 1.0: self.saturation_time += dt
+        excursion = -error * self.direction
+        if excursion > self.overshoot: self.overshoot = excursion
+        if abs(error) > self.band: self.last_outside = t
+
+    def result(self, t_end):
+        settled = self.last_outside < t_end
+        return {
+            'iae': self.iae,
+            'ise': self.ise,
+            'overshoot': self.overshoot,
+            'settling_time': self.last_outside - self.step_time if settled else math.inf,
+            'effort': self.effort,
+            'saturation_time': self.saturation_time,
+        }
+
+def evaluate(p, i, d, plant=None, profile=((0.0, 50.0, 0.0),), duration=1800.0, dt=0.25, band=1.0, reverse=True):
+    """Closed-loop run of one (P, I, D) candidate against a ThermalProcess.
+
+    `profile` is a list of (time, sv, disturbance) breakpoints held until the next one.
+    """
+    plant = dict(DEFAULT_PLANT, **(plant or {}))
+    clock = SimClock()
+    state = default_state()
+    state.pv = plant['initial_temp']
+    state.p, state.i, state.d, state.reverse = p, i, d, reverse
+    engine = SimulationEngine(state, process=ThermalProcess(clock=clock, **plant), clock=clock, dt=dt)
+    metrics = LoopMetrics(band)
+
+    events = sorted(profile)
+    k = 0
+    for _ in range(int(round(duration / dt))):
+        while k < len(events) and events[k][0] <= clock.now:
+            state.sv, state.disturbance = events[k][1], events[k][2]
+            k += 1
+        engine.step(dt)
+        metrics.update(clock.now, state.pv, state.sv, state.output, dt)
+    return metrics.result(clock.now)
+
+def _evaluate_chunk(chunk, kwargs):
+    return [dict(p=p, i=i, d=d, **evaluate(p, i, d, **kwargs)) for p, i, d in chunk]
+
+def bounded_map(fn, items, args=(), workers=None, chunk_size=32, max_pending=None, ordered=False):
+    """Yield fn(chunk, *args) results as they complete, over a process pool.
+
+    Only `max_pending` chunks are in flight at once, so `items` may be an
+    arbitrarily long generator without the submission queue growing.
+    With ordered=True results come back in input order (waiting on the
+    oldest chunk), for consumers whose result depends on arrival order.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    items = iter(items)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque() if ordered else set()
+        while True:
+            while len(pending) < max_pending:
+                chunk = list(itertools.islice(items, chunk_size))
+                if not chunk: break
+                future = pool.submit(fn, chunk, *args)
+                if ordered: pending.append(future)
+                else: pending.add(future)
+            if not pending: return
+            if ordered:
+                yield from pending.popleft().result()
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+def grid(p_values, i_values, d_values):
+    return itertools.product(p_values, i_values, d_values)
+
+def random_candidates(count, p_range, i_range, d_range, seed=None):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield (round(rng.uniform(*p_range), 1), round(rng.uniform(*i_range)), round(rng.uniform(*d_range)))
+
+def sweep(candidates, plant=None, profile=((0.0, 50.0, 0.0),), duration=1800.0, dt=0.25, band=1.0, reverse=True, workers=None, chunk_size=32):
+    """Stream one metrics row per (P, I, D) candidate, in completion order."""
+    kwargs = dict(plant=plant, profile=list(profile), duration=duration, dt=dt, band=band, reverse=reverse)
+    return bounded_map(_evaluate_chunk, candidates, (kwargs,), workers=workers, chunk_size=chunk_size)
+
+def _frange(spec):
+    # "start:stop:step" (inclusive) or a single value
+    parts = [float(x) for x in spec.split(':')]
+    if len(parts) == 1: return parts
+    start, stop, step = parts
+    n = int(math.floor((stop - start) / step + 1e-9)) + 1
+    return [round(start + k * step, 6) for k in range(n)]
+
+def _bounds(spec):
+    values = _frange(spec)
+    return (values[0], values[-1])
+
+def _events(specs):
+    return [tuple(float(x) for x in s.split(':')) for s in specs]
+
+def build_profile(sv, sv_steps=(), dist_steps=()):
+    # Merge "t:sv" and "t:disturbance" changes into (time, sv, disturbance) breakpoints
+    changes = sorted([(t, 'sv', v) for t, v in sv_steps] + [(t, 'dist', v) for t, v in dist_steps])
+    profile = [(0.0, sv, 0.0)]
+    for t, kind, v in changes:
+        _, cur_sv, cur_dist = profile[-1]
+        row = (t, v, cur_dist) if kind == 'sv' else (t, cur_sv, v)
+        if t == profile[-1][0]: profile[-1] = row
+        else: profile.append(row)
+    return profile
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel P/I/D sweep against the virtual oven")
+    parser.add_argument('--p', default='5:50:5', help="P band values, start:stop:step or single value")
+    parser.add_argument('--i', default='60:600:60', help="Integral time values (s)")
+    parser.add_argument('--d', default='0:120:20', help="Derivative time values (s)")
+    parser.add_argument('--random', type=int, default=0, metavar='N', help="Sample N random points inside the P/I/D ranges instead of a grid")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--gain', type=float, default=DEFAULT_PLANT['gain'])
+    parser.add_argument('--tau', type=float, default=DEFAULT_PLANT['tau'])
+    parser.add_argument('--lag', type=float, default=DEFAULT_PLANT['lag'])
+    parser.add_argument('--ambient', type=float, default=DEFAULT_PLANT['ambient_temp'])
+    parser.add_argument('--noise', type=float, default=DEFAULT_PLANT['noise'])
+    parser.add_argument('--integrator', choices=INTEGRATORS, default="euler", help="ThermalProcess integrator (adaptive allows large --dt)")
+    parser.add_argument('--sv', type=float, default=50.0, help="Initial set value")
+    parser.add_argument('--sv-step', action='append', default=[], metavar='T:SV', help="Change SV at time T (repeatable)")
+    parser.add_argument('--dist-step', action='append', default=[], metavar='T:DIST', help="Change disturbance at time T (repeatable)")
+    parser.add_argument('--duration', type=float, default=1800.0)
+    parser.add_argument('--dt', type=float, default=0.25)
+    parser.add_argument('--band', type=float, default=1.0, help="Settling band (+/- degC)")
+    parser.add_argument('--direct', action='store_true', help="Direct action (OR-D) instead of reverse")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='-', help="CSV output file (default stdout)")
+    parser.add_argument('--top', type=int, default=10, help="Print the best N candidates by IAE to stderr")
+    args = parser.parse_args(argv)
+
+    if args.random:
+        candidates = random_candidates(args.random, _bounds(args.p), _bounds(args.i), _bounds(args.d), args.seed)
+    else:
+        candidates = grid(_frange(args.p), _frange(args.i), _frange(args.d))
+    plant = {'initial_temp': args.ambient, 'ambient_temp': args.ambient, 'gain': args.gain, 'tau': args.tau, 'lag': args.lag, 'noise': args.noise, 'integrator': args.integrator}
+    profile = build_profile(args.sv, _events(args.sv_step), _events(args.dist_step))
+
+    out = sys.stdout if args.out == '-' else open(args.out, 'w', newline='')
+    writer = csv.DictWriter(out, fieldnames=('p', 'i', 'd') + METRICS)
+    writer.writeheader()
+    best = []
+    try:
+        for n, row in enumerate(sweep(candidates, plant, profile, args.duration, args.dt, args.band, not args.direct, args.workers)):
+            writer.writerow(row)
+            out.flush()
+            # Bounded heap: keep only the best `top` rows by IAE
+            item = (-row['iae'], n, row)
+            if len(best) < args.top: heapq.heappush(best, item)
+            elif args.top: heapq.heappushpop(best, item)
+    finally:
+        if out is not sys.stdout: out.close()
+
+    for _, _, row in sorted(best, key=lambda item: -item[0]):
+        print(f"P={row['p']:<6} I={row['i']:<6} D={row['d']:<6} IAE={row['iae']:.1f} ISE={row['ise']:.1f} "
+              f"OS={row['overshoot']:.2f} Ts={row['settling_time']:.1f}s effort={row['effort']:.1f} "
+              f"sat={row['saturation_time']:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import os
+import queue
+import struct
+import sys
+import threading
+import numpy as np
+
+MAGIC = b"E5CCLOG1"
+HEADER = struct.Struct("<8sII") # magic, record size, reserved
+
+# One fixed-size record per simulation tick
+RECORD = np.dtype([
+    ('t', '<f8'),
+    ('pv', '<f8'),
+    ('sv', '<f8'),
+    ('output', '<f8'),
+    ('p_term', '<f8'),
+    ('i_term', '<f8'),
+    ('d_term', '<f8'),
+    ('disturbance', '<f8'),
+    ('at_mode', 'u1'),
+])
+
+class TelemetryRecorder:
+    """Append-only binary tick log.
+
+    Ticks are written into a preallocated batch; full batches are handed to a
+    writer thread, so the simulation loop never waits on the disk.
+    """
+    def __init__(self, path, batch_size=1024):
+        self.path = path
+        self.batch_size = batch_size
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER.size
+        if exists:
+            with open(path, 'rb') as f:
+                magic, size, _ = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or size != RECORD.itemsize:
+                raise ValueError(f"{path} is not a compatible telemetry log")
+            # Drop a partial record left by a crash so appends stay aligned
+            tail = (os.path.getsize(path) - HEADER.size) % RECORD.itemsize
+            if tail:
+                os.truncate(path, os.path.getsize(path) - tail)
+        self.file = open(path, 'ab')
+        if not exists:
+            self.file.write(HEADER.pack(MAGIC, RECORD.itemsize, 0))
+        self.free = queue.SimpleQueue()
+        self.full = queue.SimpleQueue()
+        for _ in range(3):
+            self.free.put(np.zeros(batch_size, dtype=RECORD))
+        self.batch = self.free.get()
+        self.fill = 0
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def record(self, t, state):
+        self.batch[self.fill] = (t, state.pv, state.sv, state.output, state.p_term, state.i_term,
+                                 state.d_term, state.disturbance, 1 if state.at_mode == "AT-2" else 0)
+        self.fill += 1
+        if self.fill == self.batch_size:
+            self._hand_off(self.batch_size)
+
+    def _hand_off(self, count):
+        self.full.put((self.batch, count))
+        try:
+            self.batch = self.free.get_nowait()
+        except queue.Empty:
+            # Disk is behind: grow the pool rather than stall the loop
+            self.batch = np.zeros(self.batch_size, dtype=RECORD)
+        self.fill = 0
+
+    def _write_loop(self):
+        while True:
+            batch, count = self.full.get()
+            if batch is None: break
+            self.file.write(memoryview(batch[:count]).cast('B'))
+            self.free.put(batch)
+        self.file.flush()
+
+    def close(self):
+        if self.file.closed: return
+        if self.fill:
+            self._hand_off(self.fill)
+        self.full.put((None, 0))
+        self.writer.join()
+        self.file.close()
+
+class TelemetryLog:
+    """Memory-mapped reader; columns are zero-copy views into the file."""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, size, _ = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or size != RECORD.itemsize:
+            raise ValueError(f"{path} is not a compatible telemetry log")
+        # A trailing partial record (e.g. crash mid-write) is ignored
+        count = (os.path.getsize(path) - HEADER.size) // RECORD.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=RECORD, mode='r', offset=HEADER.size, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, key):
+        # log['pv'] -> column view, log[a:b] -> record slice
+        return self.records[key]
+
+    @property
+    def columns(self):
+        return RECORD.names
+
+    def between(self, t0, t1):
+        """Records with t0 <= t < t1 (time is monotonic within a run)."""
+        t = self.records['t']
+        lo, hi = np.searchsorted(t, [t0, t1])
+        return self.records[lo:hi]
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect or plot a telemetry log")
+    parser.add_argument('path')
+    parser.add_argument('--plot', action='store_true', help="Plot PV/SV/output (LTTB-downsampled)")
+    parser.add_argument('--from', dest='t0', type=float, default=None, help="Start time (s from first record)")
+    parser.add_argument('--to', dest='t1', type=float, default=None, help="End time (s from first record)")
+    args = parser.parse_args(argv)
+
+    log = TelemetryLog(args.path)
+    if not len(log):
+        print("Empty log", file=sys.stderr)
+        return
+    start = log['t'][0]
+    rec = log.between(start + (args.t0 or 0.0), start + args.t1 if args.t1 is not None else np.inf)
+    print(f"{len(log)} records, {log['t'][-1] - start:.1f} s; selected {len(rec)}")
+    for name in ('pv', 'sv', 'output', 'disturbance'):
+        col = rec[name]
+        if len(col): print(f"  {name:<12} min {col.min():9.3f}  max {col.max():9.3f}  mean {col.mean():9.3f}")
+
+    if args.plot and len(rec):
+        import matplotlib.pyplot as plt
+        from history import lttb
+        t = rec['t'] - start
+        fig, (ax_t, ax_o) = plt.subplots(2, 1, sharex=True)
+        for name in ('pv', 'sv'):
+            ax_t.plot(*lttb(t, rec[name], 2000), label=name.upper())
+        ax_o.plot(*lttb(t, rec['output'], 2000), color='red', label="OUT")
+        ax_t.legend(); ax_o.legend()
+        plt.show()
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,56 @@
+import math
+import random
 import time
 
+INTEGRATORS = ("euler", "exact-lag", "adaptive")
+NOISE_BLOCK = 1024 # Sensor noise samples drawn per refill
+
 class ThermalProcess:
-    def __init__(self, initial_temp=25.0, ambient_temp=25.0, gain=0.1, tau=300.0, lag=5.0):
+    """Lumped oven with nonlinear convection and a first-order sensor.
+
+    integrator:
+      "euler"     explicit Euler for both stages (original behaviour; keep dt small)
+      "exact-lag" Euler plant, exact discretization of the sensor lag
+      "adaptive"  Bogacki-Shampine RK3(2) with step-size control on the plant
+                  (local error <= tolerance degC per substep) and the exact
+                  sensor-lag solution along the cubic Hermite path of every
+                  accepted substep; with tolerance=1e-4 and 60 s steps PV stays
+                  within ~2e-4 degC of a 2 ms Euler reference at a few hundred
+                  substeps per hour (benchmarks.py: integrator_accuracy)
+    """
+    def __init__(self, initial_temp=25.0, ambient_temp=25.0, gain=0.1, tau=300.0, lag=5.0, clock=time.time, noise=0.01,
+                 integrator="euler", tolerance=1e-4, rng=None, seed=None):
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"unknown integrator: {integrator}")
         self.true_temperature = initial_temp
         self.displayed_temperature = initial_temp
         self.ambient_temp = ambient_temp
         self.k = gain  # Extreme low gain for industrial stability
         self.tau = tau  # Increased mass (300s)
         self.lag_tau = lag # High-fidelity sensor lag
-        self.last_time = time.time()
+        self.clock = clock # Injectable time source (SimClock for headless runs)
+        self.noise = noise # Sensor noise amplitude (+/- degrees)
+        # Per-process generator: the same seed replays the same noise bit-for-bit
+        self.rng = random.Random(seed) if rng is None else rng
+        self.noise_block = []
+        self.noise_index = 0
+        self.integrator = integrator
+        self.tolerance = tolerance
+        self.substep = None # Last accepted adaptive substep, reused as the next guess
+        self.substeps = 0   # Plant evaluations counter for the adaptive integrator
+        self.last_time = self.clock()
 
-    def update(self, power, disturbance=0.0):
-        now = time.time()
-        dt = now - self.last_time
+    def update(self, power, disturbance=0.0, dt=None):
+        # dt is measured from the clock unless the caller's scheduler supplies it
+        now = self.clock()
+        if dt is None: dt = now - self.last_time
         if dt <= 0: return self.displayed_temperature
         self.last_time = now
 
+        if self.integrator != "euler":
+            self._integrate(power * 100.0 * self.k, self.ambient_temp + disturbance, dt)
+            return self.displayed_temperature + self._next_noise()
+
         # Heat applied by the electric heater
         # Power is 0.0 to 1.0. Max heat output is 100 * k.
         heat_input = power * 100.0 * self.k
@@ -37,12 +72,68 @@ class ThermalProcess:
         lag_alpha = dt / (self.lag_tau + dt)
         self.displayed_temperature += lag_alpha * (self.true_temperature - self.displayed_temperature)
         
-        import random
-        noise = random.uniform(-0.01, 0.01)
-        
-        return self.displayed_temperature + noise
+        return self.displayed_temperature + self._next_noise()
+
+    def _next_noise(self):
+        # Unit-amplitude samples come in blocks; scaled here so `noise` can change live
+        i = self.noise_index
+        if i == len(self.noise_block):
+            u = self.rng.random
+            self.noise_block = [2.0 * u() - 1.0 for _ in range(NOISE_BLOCK)]
+            i = 0
+        self.noise_index = i + 1
+        return self.noise * self.noise_block[i]
+
+    def _rate(self, temp, heat_input, effective_ambient):
+        # dT/dt of the convective plant (same law as the Euler path)
+        temp_diff = temp - effective_ambient
+        return (heat_input - temp_diff * (1.0 + abs(temp_diff) / 100.0) * 1.5) / self.tau
+
+    def _lag(self, t0, t1, h, s0=None, s1=None):
+        # Exact first-order lag response over h to the cubic Hermite path of the
+        # true temperature (t0 -> t1 with end slopes s0, s1; linear if omitted)
+        L = self.lag_tau
+        chord = (t1 - t0) / h
+        if s0 is None or h < 1e-6 * L: s0 = s1 = chord
+        c = (3.0 * chord - 2.0 * s0 - s1) / h
+        d = (s0 + s1 - 2.0 * chord) / (h * h)
+        # Particular solution y_p = u - L u' + L^2 u'' - L^3 u''' at both ends
+        yp0 = t0 - L * s0 + L * L * 2.0 * c - L ** 3 * 6.0 * d
+        yp1 = t1 - L * s1 + L * L * (2.0 * c + 6.0 * d * h) - L ** 3 * 6.0 * d
+        self.displayed_temperature = yp1 + (self.displayed_temperature - yp0) * math.exp(-h / L)
+
+    def _integrate(self, heat_input, effective_ambient, dt):
+        temp = self.true_temperature
+        if self.integrator == "exact-lag":
+            new_temp = temp + self._rate(temp, heat_input, effective_ambient) * dt
+            self._lag(temp, new_temp, dt)
+            self.true_temperature = new_temp
+            return
+
+        rate = self._rate
+        tol = self.tolerance
+        h = min(dt, self.substep or dt)
+        remaining = dt
+        k1 = rate(temp, heat_input, effective_ambient)
+        while remaining > 0.0:
+            h = min(h, remaining)
+            k2 = rate(temp + 0.5 * h * k1, heat_input, effective_ambient)
+            k3 = rate(temp + 0.75 * h * k2, heat_input, effective_ambient)
+            new_temp = temp + h * (2.0 / 9.0 * k1 + 1.0 / 3.0 * k2 + 4.0 / 9.0 * k3)
+            k4 = rate(new_temp, heat_input, effective_ambient)
+            err = abs(h * (-5.0 / 72.0 * k1 + 1.0 / 12.0 * k2 + 1.0 / 9.0 * k3 - 1.0 / 8.0 * k4))
+            self.substeps += 1
+            if err <= tol:
+                self._lag(temp, new_temp, h, k1, k4)
+                temp, k1 = new_temp, k4 # FSAL: last stage is the next first stage
+                remaining -= h
+                if remaining < 1e-12 * dt: remaining = 0.0
+                self.substep = h
+            # Standard controller for an order-3 pair, growth limited to 5x
+            h *= min(5.0, max(0.2, 0.9 * (tol / err) ** (1.0 / 3.0))) if err > 0 else 5.0
+        self.true_temperature = temp
 
     def reset(self, temp=25.0):
         self.true_temperature = temp
         self.displayed_temperature = temp
-        self.last_time = time.time()
+        self.last_time = self.clock()
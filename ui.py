@@ -2,17 +2,17 @@ import tkinter as tk
 from tkinter import ttk
 import time
 import threading
-try:
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    HAS_MATPLOTLIB = True
-except ImportError:
-    HAS_MATPLOTLIB = False
+from importlib.util import find_spec
+
+# Only looked up here; matplotlib/numpy are imported by setup_graph after the panel is shown,
+# which still falls back to the bare panel if they turn out not to import
+HAS_MATPLOTLIB = find_spec("matplotlib") is not None
 
 class E5CC_UI:
-    def __init__(self, root, simulator):
+    def __init__(self, root, simulator, metrics=None, graph_hz=10.0):
         self.root = root
         self.simulator = simulator
+        self.metrics = metrics # Optional metrics.Metrics shown in a line of its own above the status bar
         self.root.title("Omron E5CC Virtual Simulator")
         self.root.geometry("450x800")
         self.root.configure(bg="#1a1a1a")
@@ -34,10 +34,20 @@ class E5CC_UI:
         self.menu_index = 0
         self.update_count = 0
         
+        self.history = None # RingHistory, created with the graph
+        self.graph_hz = graph_hz
+        self.shown = {} # widget -> options last passed to config()
         self.setup_ui()
-        if HAS_MATPLOTLIB:
-            self.setup_graph()
         self.update_loop()
+        if HAS_MATPLOTLIB:
+            # Load the graph stack once the panel is on screen, not on a timer
+            # that can come due before the first paint
+            self.case.bind("<Map>", self.on_panel_shown)
+
+    def on_panel_shown(self, event):
+        self.case.unbind("<Map>")
+        # after_idle runs behind the pending redraws; after(0) then lets them reach the screen
+        self.root.after_idle(lambda: self.root.after(0, self.setup_graph))
 
     def setup_ui(self):
         # Front Panel Case
@@ -129,6 +139,10 @@ class E5CC_UI:
         # Footer Status
         self.status_bar = tk.Label(self.root, text="System Ready | Closed-Loop 50ms", bg="#000", fg="#444", font=("Arial", 8))
         self.status_bar.pack(side="bottom", fill="x")
+        # Own line, so the overlay never replaces status messages (e.g. F5/F9)
+        if self.metrics is not None:
+            self.metrics_bar = tk.Label(self.root, text="Profiling...", bg="#000", fg="#444", font=("Arial", 8))
+            self.metrics_bar.pack(side="bottom", fill="x")
 
     def level_hold_start(self, e): self.hold_time = time.time()
     def level_hold_stop(self, e):
@@ -153,109 +167,123 @@ class E5CC_UI:
         if self.level == "Adjustment": self.menu_index = (self.menu_index + 1) % len(self.adjustment_menus)
         elif self.level == "Initial": self.menu_index = (self.menu_index + 1) % len(self.initial_menus)
 
+    # Edits are queued and applied by the simulation thread between ticks
     def on_up(self):
-        if self.level == "Operation": self.simulator.sv += 1.0
+        if self.level == "Operation": self.simulator.nudge("sv", 1.0)
         elif self.level == "Adjustment":
             m = self.adjustment_menus[self.menu_index]
-            if m == "AT":
-                self.simulator.at_mode = "AT-2"
-                self.simulator.at_active = True
-            elif m == "P": self.simulator.p = round(self.simulator.p + 0.1, 1)
-            elif m == "I": self.simulator.i += 10
-            elif m == "D": self.simulator.d += 5
+            if m == "AT": self.simulator.set(at_mode="AT-2", at_active=True)
+            elif m == "P": self.simulator.nudge("p", 0.1, ndigits=1)
+            elif m == "I": self.simulator.nudge("i", 10)
+            elif m == "D": self.simulator.nudge("d", 5)
         elif self.level == "Initial":
-            if self.initial_menus[self.menu_index] == "OREV": self.simulator.reverse = not self.simulator.reverse
+            if self.initial_menus[self.menu_index] == "OREV": self.simulator.toggle("reverse")
 
     def on_down(self):
-        if self.level == "Operation": self.simulator.sv -= 1.0
+        if self.level == "Operation": self.simulator.nudge("sv", -1.0)
         elif self.level == "Adjustment":
             m = self.adjustment_menus[self.menu_index]
-            if m == "AT":
-                self.simulator.at_mode = "OFF"
-                self.simulator.at_active = False
-            elif m == "P": self.simulator.p = round(max(0.1, self.simulator.p - 0.1), 1)
-            elif m == "I": self.simulator.i = max(0, self.simulator.i - 10)
-            elif m == "D": self.simulator.d = max(0, self.simulator.d - 5)
+            if m == "AT": self.simulator.set(at_mode="OFF", at_active=False)
+            elif m == "P": self.simulator.nudge("p", -0.1, lo=0.1, ndigits=1)
+            elif m == "I": self.simulator.nudge("i", -10, lo=0)
+            elif m == "D": self.simulator.nudge("d", -5, lo=0)
         elif self.level == "Initial":
-            if self.initial_menus[self.menu_index] == "OREV": self.simulator.reverse = not self.simulator.reverse
+            if self.initial_menus[self.menu_index] == "OREV": self.simulator.toggle("reverse")
 
     def on_dist(self, v):
-        self.simulator.disturbance = float(v)
+        self.simulator.set(disturbance=float(v))
         self.dist_info.config(text=f"Perturbación térmica: {float(v):.1f}°C")
 
     def setup_graph(self):
+        try:
+            from history import RingHistory
+            from live_graph import LiveGraph
+        except ImportError:
+            return # numpy or the TkAgg backend is unusable: keep the panel without the graph
         self.graph_frame = tk.Frame(self.root, bg=self.bg_color)
         self.graph_frame.pack(fill="both", expand=True, padx=20, pady=5)
-        self.fig, self.ax = plt.subplots(figsize=(4, 3), facecolor=self.bg_color)
-        self.ax.set_facecolor("black")
-        self.ax.tick_params(colors="#555", labelsize=8)
-        self.pv_data, self.sv_data, self.time_data = [], [], []
-        self.pv_line, = self.ax.plot([], [], color="white", linewidth=1.5, label="PV")
-        self.sv_line, = self.ax.plot([], [], color=self.sv_color, linewidth=1, linestyle="--", label="SV")
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self.graph_frame)
-        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        # 24h of samples at the 500ms history rate, fixed memory
+        self.history = RingHistory(capacity=24 * 3600 * 2)
+        self.graph = LiveGraph(self.graph_frame, self.history, self.bg_color, self.sv_color)
+        self.graph.widget().pack(fill="both", expand=True)
+
+        # Zoom: last minute out to last 24 hours
+        zoom_bar = tk.Frame(self.graph_frame, bg=self.bg_color)
+        zoom_bar.pack(fill="x")
+        for text, span in (("1m", 60), ("10m", 600), ("1h", 3600), ("24h", 86400)):
+            tk.Button(zoom_bar, text=text, bg="#333", fg="#aaa", relief="flat", font=("Arial", 8),
+                      command=lambda s=span: self.set_graph_span(s)).pack(side="left", expand=True, fill="x")
+        self.graph_loop()
+
+    def set_graph_span(self, seconds):
+        self.graph.set_span(seconds)
+        self.redraw_graph()
+
+    def graph_loop(self):
+        # Own timer: blitting keeps a frame cheap enough for 10-20 Hz
+        self.redraw_graph()
+        self.root.after(int(1000 / self.graph_hz), self.graph_loop)
+
+    def redraw_graph(self):
+        sim = self.simulator.snapshot()
+        self.graph.draw(sim.pv, sim.sv, time.time())
+
+    def show(self, widget, **options):
+        # Only hand Tk the options whose value differs from what is on screen
+        shown = self.shown.setdefault(widget, {})
+        changed = {k: v for k, v in options.items() if shown.get(k) != v}
+        if changed:
+            widget.config(**changed)
+            shown.update(changed)
 
     def update_loop(self):
+        # One consistent tick for the whole redraw
+        sim = self.simulator.snapshot()
+
         # Update Main Display
         if self.level == "Operation":
-            self.pv_display.config(text=f"{self.simulator.pv:.1f}", fg=self.pv_color)
-            self.sv_display.config(text=f"{self.simulator.sv:.1f}", fg=self.sv_color)
+            self.show(self.pv_display, text=f"{sim.pv:.1f}", fg=self.pv_color)
+            self.show(self.sv_display, text=f"{sim.sv:.1f}", fg=self.sv_color)
         else:
             menu = self.adjustment_menus[self.menu_index] if self.level == "Adjustment" else self.initial_menus[self.menu_index]
-            self.pv_display.config(text=f"{menu}", fg=self.accent_color, font=("Consolas", 40, "bold"))
+            self.show(self.pv_display, text=f"{menu}", fg=self.accent_color, font=("Consolas", 40, "bold"))
             val = ""
-            if menu == "AT": val = self.simulator.at_mode
-            elif menu == "P": val = f"{self.simulator.p:.1f}"
-            elif menu == "I": val = f"{self.simulator.i}"
-            elif menu == "D": val = f"{self.simulator.d}"
-            elif menu == "OREV": val = "OR-R" if self.simulator.reverse else "OR-D"
-            self.sv_display.config(text=val, fg=self.accent_color)
+            if menu == "AT": val = sim.at_mode
+            elif menu == "P": val = f"{sim.p:.1f}"
+            elif menu == "I": val = f"{sim.i}"
+            elif menu == "D": val = f"{sim.d}"
+            elif menu == "OREV": val = "OR-R" if sim.reverse else "OR-D"
+            self.show(self.sv_display, text=val, fg=self.accent_color)
 
         # LEDS
-        if self.simulator.at_active:
-            self.at_led.config(fg="orange")
-        else:
-            self.at_led.config(fg="#333")
-
-        # LED OUT1 (Red pulse)
-        if self.simulator.output > 0:
-            # PWM effect simulation in UI
-            if (self.update_count % 10) < (self.simulator.output * 10):
-                self.out1_led.config(fg="red")
-            else:
-                self.out1_led.config(fg="#333")
-        else:
-            self.out1_led.config(fg="#333")
+        self.show(self.at_led, fg="orange" if sim.at_active else "#333")
+
+        # LED OUT1 (Red pulse): PWM effect simulation in UI
+        pulse = sim.output > 0 and (self.update_count % 10) < (sim.output * 10)
+        self.show(self.out1_led, fg="red" if pulse else "#333")
 
         # Power Bar
-        h = int(self.simulator.output * 120)
-        self.power_bar.config(height=h)
+        self.show(self.power_bar, height=int(sim.output * 120))
 
         # Update PID telemetry
-        self.p_label.config(text=f"P:{self.simulator.p_term:>5.1f}%")
-        self.i_label.config(text=f"I:{self.simulator.i_term:>5.1f}%")
-        self.d_label.config(text=f"D:{self.simulator.d_term:>5.1f}%")
-
-        # Graph Update (every 500ms to save performance)
-        if HAS_MATPLOTLIB and self.update_count % 5 == 0:
-            self.time_data.append(time.time())
-            self.pv_data.append(self.simulator.pv)
-            self.sv_data.append(self.simulator.sv)
-            if len(self.time_data) > 100:
-                self.time_data.pop(0); self.pv_data.pop(0); self.sv_data.pop(0)
-            t_rel = [t - self.time_data[0] for t in self.time_data]
-            self.pv_line.set_data(t_rel, self.pv_data)
-            self.sv_line.set_data(t_rel, self.sv_data)
-            self.ax.relim(); self.ax.autoscale_view()
-            self.canvas.draw()
+        self.show(self.p_label, text=f"P:{sim.p_term:>5.1f}%")
+        self.show(self.i_label, text=f"I:{sim.i_term:>5.1f}%")
+        self.show(self.d_label, text=f"D:{sim.d_term:>5.1f}%")
+
+        # History sample every 500ms (24h window); graph_loop draws it
+        if self.history is not None and self.update_count % 5 == 0:
+            self.history.append(time.time(), sim.pv, sim.sv, sim.output, sim.p_term, sim.i_term, sim.d_term)
+
+        # Profiling overlay (once a second)
+        if self.metrics is not None and self.update_count % 10 == 0:
+            self.show(self.metrics_bar, text=self.metrics.summary(("sim.tick", "ui.update_loop", "ui.graph")) or "Profiling...")
 
         self.update_count += 1
         self.root.after(100, self.update_loop)
 
 if __name__ == "__main__":
-    # Test stub
-    class State:
-        def __init__(self): self.pv=25.0; self.sv=50.0; self.output=0.5; self.p=25.0; self.i=480; self.d=80; self.reverse=True; self.disturbance=0.0
+    # Test stub: static state, edits queue up but nothing drains them
+    from sim_state import SharedState
     root = tk.Tk()
-    E5CC_UI(root, State())
+    E5CC_UI(root, SharedState())
     root.mainloop()
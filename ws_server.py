@@ -0,0 +1,340 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import math
+import os
+import socket
+import struct
+import threading
+from urllib.parse import parse_qs
+
+# Frame fields as (snapshot attribute, scale): sent as integers, the browser divides back.
+# A last field packs the flags: bit 0 AT active, bit 1 direct action (OR-D).
+FRAME_FIELDS = (('pv', 100), ('sv', 10), ('output', 1000), ('p_term', 10), ('i_term', 10), ('d_term', 10),
+                ('p', 10), ('i', 1), ('d', 1), ('disturbance', 10))
+FIELD_COUNT = len(FRAME_FIELDS) + 1
+
+# Binary frames, little-endian:
+#   key   B type=0, I seq, d time, FIELD_COUNT x i values
+#   delta B type=1, I seq, d time, H changed-field mask, one h difference per set bit
+KEY = struct.Struct(f"<BId{FIELD_COUNT}i")
+DELTA = struct.Struct("<BIdH")
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_CLIENT_FRAME = 4096 # Browsers only send close/ping here; anything bigger is dropped
+STATIC = {
+    '/': ('dashboard.html', 'text/html; charset=utf-8'),
+    '/dashboard.html': ('dashboard.html', 'text/html; charset=utf-8'),
+    '/style.css': ('style.css', 'text/css; charset=utf-8'),
+}
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def _int32(value):
+    return max(-2147483648, min(2147483647, int(round(value))))
+
+def quantize(snap):
+    values = [_int32(getattr(snap, name) * scale) for name, scale in FRAME_FIELDS]
+    values.append((1 if snap.at_active else 0) | (0 if snap.reverse else 2))
+    return tuple(values)
+
+def encode_key(seq, time, values):
+    return KEY.pack(0, seq & 0xFFFFFFFF, time, *values)
+
+def encode_delta(seq, time, base, values):
+    """Changed fields only, or None if a difference does not fit in 16 bits."""
+    mask = 0
+    deltas = []
+    for k, (old, new) in enumerate(zip(base, values)):
+        if old != new:
+            delta = new - old
+            if not -32768 <= delta <= 32767: return None
+            mask |= 1 << k
+            deltas.append(delta)
+    return DELTA.pack(1, seq & 0xFFFFFFFF, time, mask) + struct.pack(f"<{len(deltas)}h", *deltas)
+
+def decode(payload, values):
+    """Apply one frame to `values` (FIELD_COUNT ints, updated in place); returns (seq, time)."""
+    seq, time = struct.unpack_from("<Id", payload, 1)
+    if payload[0] == 0:
+        values[:] = KEY.unpack(payload)[3:]
+        return seq, time
+    mask = DELTA.unpack_from(payload)[3]
+    offset = DELTA.size
+    for k in range(FIELD_COUNT):
+        if mask >> k & 1:
+            values[k] += struct.unpack_from("<h", payload, offset)[0]
+            offset += 2
+    return seq, time
+
+def values_dict(values):
+    fields = {name: value / scale for (name, scale), value in zip(FRAME_FIELDS, values)}
+    fields['at_active'], fields['reverse'] = bool(values[-1] & 1), not values[-1] & 2
+    return fields
+
+def ws_frame(payload, opcode=0x2):
+    """One unmasked, unfragmented server frame (RFC 6455 section 5.2)."""
+    n = len(payload)
+    if n < 126: return bytes((0x80 | opcode, n)) + payload
+    if n < 65536: return struct.pack(">BBH", 0x80 | opcode, 126, n) + payload
+    return struct.pack(">BBQ", 0x80 | opcode, 127, n) + payload
+
+async def _read_frame(reader):
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126: n, = struct.unpack(">H", await reader.readexactly(2))
+    elif n == 127: n, = struct.unpack(">Q", await reader.readexactly(8))
+    # Client frames must be masked
+    if not b1 & 0x80 or n > MAX_CLIENT_FRAME: raise ConnectionError("bad client frame")
+    mask = await reader.readexactly(4)
+    data = await reader.readexactly(n)
+    return b0 & 0x0F, bytes(b ^ mask[k & 3] for k, b in enumerate(data))
+
+class _Viewer:
+    # `base` is the value tuple the browser holds once everything written so far arrives
+    __slots__ = ('writer', 'every', 'base', 'sent', 'skipped', 'behind')
+
+    def __init__(self, writer, every):
+        self.writer = writer
+        self.every = every
+        self.base = None
+        self.sent = 0
+        self.skipped = 0
+        self.behind = 0
+
+class TelemetryServer:
+    """WebSocket broadcast of the published snapshots to browser dashboards.
+
+    One task samples `shared.snapshot()` at `rate_hz` and never touches the
+    simulation thread. Each tick is encoded once per distinct client base, so
+    the usual case (every client up to date) is one delta frame written to all
+    transports. Writes are never awaited: a client whose socket buffer is over
+    `max_buffer` just misses ticks and gets the latest values, as a delta
+    against what it already has, once it drains; after `stall_timeout` seconds
+    behind it is disconnected. `?hz=N` in the URL decimates a client's stream.
+    Plain GETs serve dashboard.html and style.css.
+    """
+    def __init__(self, shared, host="127.0.0.1", port=8765, rate_hz=20.0, max_buffer=16384, stall_timeout=10.0,
+                 max_viewers=1000):
+        self.shared = shared
+        self.host = host
+        self.port = port
+        self.rate_hz = rate_hz
+        self.max_buffer = max_buffer
+        self.max_behind = max(1, int(stall_timeout * rate_hz))
+        self.max_viewers = max_viewers
+        self.viewers = set()
+        self.seq = 0
+        self.server = None
+        self.loop = None
+        self.thread = None
+        self.task = None
+
+    def broadcast(self, snap):
+        """Send one snapshot to every viewer due this tick; returns frames written."""
+        self.seq += 1
+        seq, values = self.seq, quantize(snap)
+        frames = {}
+        written = 0
+        for viewer in self.viewers:
+            if seq % viewer.every: continue
+            transport = viewer.writer.transport
+            if transport.get_write_buffer_size() > self.max_buffer:
+                # Coalesce: skip this tick, the base is still what the browser will end up with
+                viewer.skipped += 1
+                viewer.behind += 1
+                if viewer.behind > self.max_behind: transport.abort()
+                continue
+            frame = frames.get(viewer.base)
+            if frame is None:
+                payload = None if viewer.base is None else encode_delta(seq, snap.time, viewer.base, values)
+                if payload is None: payload = encode_key(seq, snap.time, values)
+                frame = frames[viewer.base] = ws_frame(payload)
+            transport.write(frame)
+            viewer.base = values
+            viewer.sent += 1
+            viewer.behind = 0
+            written += 1
+        return written
+
+    async def _broadcast_loop(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.rate_hz
+        deadline = loop.time()
+        last = None
+        while True:
+            deadline += period
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            if loop.time() - deadline > period: deadline = loop.time() # Stalled: don't burst to catch up
+            snap = self.shared.snapshot()
+            # Nothing new published (paused or slower simulation): nothing to send
+            if snap is last or not self.viewers: continue
+            last = snap
+            self.broadcast(snap)
+
+    async def _client(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None: sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        viewer = None
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10.0)
+            lines = request.decode('latin-1').split("\r\n")
+            target = lines[0].split(" ")[1]
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            path, _, query = target.partition('?')
+
+            if headers.get('upgrade', '').lower() != 'websocket':
+                writer.write(self._static(path))
+                await writer.drain()
+                return
+            key = headers.get('sec-websocket-key')
+            if key is None or headers.get('sec-websocket-version') != '13':
+                writer.write(b"HTTP/1.1 426 Upgrade Required\r\nSec-WebSocket-Version: 13\r\nContent-Length: 0\r\n\r\n")
+                return
+            # Checked before the upgrade so a bad rate is answered, not a silent stream
+            hz = parse_qs(query).get('hz')
+            try:
+                hz = float(hz[0]) if hz else self.rate_hz
+            except ValueError:
+                hz = math.nan
+            if not 0.0 < hz < math.inf:
+                writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+                return
+            if len(self.viewers) >= self.max_viewers:
+                writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n")
+                return
+            accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+            writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                          f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+            viewer = _Viewer(writer, max(1, round(self.rate_hz / hz)))
+            self.viewers.add(viewer)
+
+            while True:
+                opcode, payload = await _read_frame(reader)
+                if opcode == 0x8:
+                    writer.write(ws_frame(payload[:2], 0x8))
+                    break
+                if opcode == 0x9: writer.write(ws_frame(payload, 0xA))
+                # Data frames from the browser are ignored: the stream is read-only
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError,
+                IndexError, ValueError):
+            pass
+        finally:
+            self.viewers.discard(viewer)
+            writer.close()
+
+    def _static(self, path):
+        entry = STATIC.get(path)
+        if entry is None: return b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+        with open(os.path.join(ROOT, entry[0]), 'rb') as f: body = f.read()
+        return (f"HTTP/1.1 200 OK\r\nContent-Type: {entry[1]}\r\nContent-Length: {len(body)}\r\n"
+                "Cache-Control: no-cache\r\nConnection: close\r\n\r\n").encode() + body
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._client, self.host, self.port)
+        if self.port == 0:
+            self.port = self.server.sockets[0].getsockname()[1]
+        self.task = asyncio.get_running_loop().create_task(self._broadcast_loop())
+        return self.server
+
+    def start_in_thread(self):
+        """Run the server on its own event loop thread; returns once it is listening.
+        A bind error (port in use, privileged port) is raised here."""
+        ready = threading.Event()
+        failed = []
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            try:
+                self.loop.run_until_complete(self.start())
+            except BaseException as exc:
+                failed.append(exc)
+                self.loop.close()
+                return
+            finally:
+                ready.set()
+            self.loop.run_forever()
+            self.task.cancel()
+            self.server.close()
+            for viewer in list(self.viewers): viewer.writer.transport.abort()
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.run_until_complete(asyncio.sleep(0)) # Let cancelled tasks finish
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, name="websocket", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if failed:
+            self.thread.join()
+            self.loop = None
+            raise failed[0]
+        return self
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=2.0)
+
+class TelemetryClient:
+    """Minimal blocking WebSocket viewer, enough to check the stream in tests."""
+    def __init__(self, host="127.0.0.1", port=8765, hz=None, timeout=2.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        key = base64.b64encode(os.urandom(16)).decode()
+        query = f"?hz={hz}" if hz else ""
+        self.sock.sendall((f"GET /{query} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+                           f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        response = b""
+        while not response.endswith(b"\r\n\r\n"):
+            chunk = self.sock.recv(1)
+            if not chunk: raise ConnectionError("server closed the connection")
+            response += chunk
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest())
+        if not response.startswith(b"HTTP/1.1 101") or accept not in response:
+            raise IOError(f"handshake refused: {response.splitlines()[0].decode('latin-1')}")
+        self.values = [0] * FIELD_COUNT
+
+    def _recv(self, n):
+        data = b""
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk: raise ConnectionError("server closed the connection")
+            data += chunk
+        return data
+
+    def recv(self):
+        """Next telemetry frame as (seq, time, fields)."""
+        while True:
+            b0, b1 = self._recv(2)
+            n = b1 & 0x7F
+            if n == 126: n, = struct.unpack(">H", self._recv(2))
+            elif n == 127: n, = struct.unpack(">Q", self._recv(8))
+            payload = self._recv(n)
+            if b0 & 0x0F == 0x2:
+                seq, time = decode(payload, self.values)
+                return seq, time, values_dict(self.values)
+            if b0 & 0x0F == 0x8: raise ConnectionError("server closed the stream")
+
+    def close(self):
+        mask = os.urandom(4)
+        self.sock.sendall(bytes((0x88, 0x82)) + mask + bytes(b ^ mask[k] for k, b in enumerate(struct.pack(">H", 1000))))
+        self.sock.close()
+
+if __name__ == "__main__":
+    # Headless: a wall-clock simulation streamed to browsers, no Tk needed
+    import time
+    from simulation import SimulationEngine
+    parser = argparse.ArgumentParser(description="Stream a headless simulator to browser dashboards")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rate', type=float, default=20.0, help="Simulation and broadcast rate in Hz")
+    args = parser.parse_args()
+    engine = SimulationEngine(clock=time.time)
+    server = TelemetryServer(engine.shared, args.host, args.port, args.rate).start_in_thread()
+    print(f"Dashboard on http://{args.host}:{server.port}/")
+    try:
+        engine.run_realtime(args.rate)
+    except KeyboardInterrupt:
+        server.stop()